@@ -12,12 +12,13 @@ damit der MAX Account verwendet werden kann.
 """
 
 import asyncio
-import json
 import logging
 import os
 import shutil
 from dataclasses import dataclass, field
-from typing import Awaitable, Callable, Optional
+from typing import Awaitable, Callable, Iterable, Optional
+
+import orjson
 
 from core.app.config import settings
 
@@ -138,7 +139,7 @@ class ClaudeCodingBridge:
         self,
         project_dir: str,
         *,
-        allowed_tools: Optional[list[str]] = None,
+        allowed_tools: Optional[Iterable[str]] = None,
         max_turns: Optional[int] = None,
         system_prompt: Optional[str] = None,
         session_id: Optional[str] = None,
@@ -164,8 +165,9 @@ class ClaudeCodingBridge:
             args.extend(["--resume", session_id])
 
         if allowed_tools:
-            # Komma-separiert uebergeben damit variadic flag nicht den Rest frisst
-            args.extend(["--allowedTools", ",".join(allowed_tools)])
+            # Komma-separiert uebergeben damit variadic flag nicht den Rest frisst;
+            # sortiert, damit die Reihenfolge bei frozenset stabil bleibt
+            args.extend(["--allowedTools", ",".join(sorted(allowed_tools))])
 
         return args
 
@@ -225,15 +227,18 @@ class ClaudeCodingBridge:
 
             # Stream JSON-Output zeilenweise lesen
             async for line_bytes in process.stdout:
-                line = line_bytes.decode("utf-8", errors="replace").strip()
+                # orjson parst die Bytes direkt (kein Decode zu str pro Event)
+                line = line_bytes.strip()
                 if not line:
                     continue
 
                 try:
-                    event = json.loads(line)
-                except json.JSONDecodeError:
+                    event = orjson.loads(line)
+                except orjson.JSONDecodeError:
                     # Nicht-JSON-Output (z.B. Warnings) loggen
-                    logger.debug(f"[ClaudeBridge] Non-JSON: {line[:200]}")
+                    logger.debug(
+                        f"[ClaudeBridge] Non-JSON: {line[:200].decode('utf-8', errors='replace')}"
+                    )
                     continue
 
                 msg_type = event.get("type", "")
@@ -359,7 +364,7 @@ class ClaudeCodingBridge:
 
             # JSON-Output parsen
             try:
-                data = json.loads(output)
+                data = orjson.loads(output)
                 # json format gibt result direkt zurueck
                 result_text = data.get("result", "")
                 if result_text:
@@ -368,7 +373,7 @@ class ClaudeCodingBridge:
                 for block in data.get("content", []):
                     if block.get("type") == "text":
                         return block.get("text", "")
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 # Plaintext-Fallback
                 return output[:500]
 
@@ -4,13 +4,12 @@ Ideen-Store fuer Ideas-Agent.
 CRUD-Operationen fuer Ideen in SQLite.
 """
 
-import json
 import logging
 import uuid
 from datetime import datetime
 from typing import Optional
 
-from core.app.db.database import Database
+from core.app.db.database import Database, json_dumps, json_loads
 
 logger = logging.getLogger(__name__)
 
@@ -72,7 +71,7 @@ class IdeaStore:
                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
             (idea.id, idea.title, idea.description, idea.category,
              idea.priority, idea.status,
-             json.dumps(idea.tags), json.dumps(idea.notes))
+             json_dumps(idea.tags), json_dumps(idea.notes))
         )
         logger.info(f"Idee erstellt: {idea.id} ({idea.title})")
         return idea
@@ -114,7 +113,7 @@ class IdeaStore:
             """UPDATE ideas SET title=?, description=?, category=?, priority=?,
                status=?, tags=?, notes=?, updated_at=? WHERE id=?""",
             (idea.title, idea.description, idea.category, idea.priority,
-             idea.status, json.dumps(idea.tags), json.dumps(idea.notes),
+             idea.status, json_dumps(idea.tags), json_dumps(idea.notes),
              idea.updated_at, idea.id)
         )
         return idea
@@ -143,8 +142,8 @@ class IdeaStore:
 
     def _row_to_idea(self, row: dict) -> Idea:
         """Konvertiert DB-Row zu Idea."""
-        tags = json.loads(row.get("tags", "[]")) if isinstance(row.get("tags"), str) else []
-        notes = json.loads(row.get("notes", "[]")) if isinstance(row.get("notes"), str) else []
+        tags = json_loads(row.get("tags", "[]")) if isinstance(row.get("tags"), str) else []
+        notes = json_loads(row.get("notes", "[]")) if isinstance(row.get("notes"), str) else []
 
         return Idea(
             id=row["id"],
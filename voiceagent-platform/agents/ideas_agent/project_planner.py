@@ -4,13 +4,12 @@ Projekt-Planer fuer Ideas-Agent.
 Erstellt Projekte aus Ideen und plant deren Umsetzung.
 """
 
-import json
 import logging
 import uuid
 from datetime import datetime
 from typing import Optional
 
-from core.app.db.database import Database
+from core.app.db.database import Database, json_dumps, json_loads
 
 logger = logging.getLogger(__name__)
 
@@ -71,8 +70,8 @@ class ProjectPlanner:
             """INSERT INTO projects (id, title, description, status, ideas, tasks, plan, milestones)
                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
             (project.id, project.title, project.description, project.status,
-             json.dumps(project.ideas), json.dumps(project.tasks),
-             project.plan, json.dumps(project.milestones))
+             json_dumps(project.ideas), json_dumps(project.tasks),
+             project.plan, json_dumps(project.milestones))
         )
         logger.info(f"Projekt erstellt: {project.id} ({project.title})")
         return project
@@ -106,8 +105,8 @@ class ProjectPlanner:
             """UPDATE projects SET title=?, description=?, status=?,
                ideas=?, tasks=?, plan=?, milestones=?, updated_at=? WHERE id=?""",
             (project.title, project.description, project.status,
-             json.dumps(project.ideas), json.dumps(project.tasks),
-             project.plan, json.dumps(project.milestones),
+             json_dumps(project.ideas), json_dumps(project.tasks),
+             project.plan, json_dumps(project.milestones),
              project.updated_at, project.id)
         )
         return project
@@ -130,10 +129,10 @@ class ProjectPlanner:
             title=row["title"],
             description=row.get("description", ""),
             status=row.get("status", "planning"),
-            ideas=json.loads(row.get("ideas", "[]")) if isinstance(row.get("ideas"), str) else [],
-            tasks=json.loads(row.get("tasks", "[]")) if isinstance(row.get("tasks"), str) else [],
+            ideas=json_loads(row.get("ideas", "[]")) if isinstance(row.get("ideas"), str) else [],
+            tasks=json_loads(row.get("tasks", "[]")) if isinstance(row.get("tasks"), str) else [],
             plan=row.get("plan", ""),
-            milestones=json.loads(row.get("milestones", "[]")) if isinstance(row.get("milestones"), str) else [],
+            milestones=json_loads(row.get("milestones", "[]")) if isinstance(row.get("milestones"), str) else [],
             created_at=row.get("created_at", ""),
             updated_at=row.get("updated_at", ""),
         )
@@ -7,7 +7,7 @@ Bietet Registration, Lookup und Intent-basiertes Routing.
 import importlib
 import logging
 import os
-from typing import Optional
+from typing import Callable, Iterable, Optional
 
 from core.app.agents.base import BaseAgent
 
@@ -24,6 +24,10 @@ class AgentRegistry:
 
     def __init__(self):
         self._agents: dict[str, BaseAgent] = {}
+        # Entdeckte, aber noch nicht importierte Agenten: Ordnername -> agent.py
+        self._pending: dict[str, str] = {}
+        # Hook nach dem Laden eines entdeckten Agenten (z.B. Abhaengigkeiten injizieren)
+        self.on_agent_loaded: Optional[Callable[[BaseAgent], None]] = None
 
     def register(self, agent: BaseAgent):
         """
@@ -54,18 +58,27 @@ class AgentRegistry:
         Returns:
             BaseAgent-Instanz oder None
         """
+        if agent_name not in self._agents and self._pending:
+            # Schneller Weg: Ordnername == Agent-Name
+            self._load_agent(agent_name)
+            if agent_name not in self._agents:
+                # Ordnername weicht vom Agent-Namen ab: alle ausstehenden laden
+                self._load_all_pending()
         return self._agents.get(agent_name)
 
     def get_all_agents(self) -> list[BaseAgent]:
-        """Gibt alle registrierten Agenten zurueck."""
+        """Gibt alle registrierten Agenten zurueck (laedt noch ausstehende)."""
+        self._load_all_pending()
         return list(self._agents.values())
 
     def get_agent_names(self) -> list[str]:
-        """Gibt alle registrierten Agent-Namen zurueck."""
+        """Gibt alle registrierten Agent-Namen zurueck (laedt noch ausstehende)."""
+        self._load_all_pending()
         return list(self._agents.keys())
 
     def get_agent_info(self) -> list[dict]:
         """Gibt Info ueber alle Agenten zurueck (fuer API/GUI)."""
+        self._load_all_pending()
         return [
             {
                 "name": agent.name,
@@ -87,6 +100,7 @@ class AgentRegistry:
         Returns:
             Bester Agent oder None wenn kein Agent passt
         """
+        self._load_all_pending()
         best_agent = None
         best_score = 0.0
 
@@ -104,15 +118,18 @@ class AgentRegistry:
 
         return None
 
-    def discover_agents(self, agents_dir: str):
+    def discover_agents(self, agents_dir: str, preload: Iterable[str] = ()):
         """
-        Entdeckt und laedt Agenten aus einem Verzeichnis.
+        Entdeckt Agenten in einem Verzeichnis.
 
         Erwartet in jedem Unterordner eine agent.py mit einer
         Klasse die BaseAgent implementiert und eine create_agent() Funktion.
+        Importiert werden sofort nur die Ordner aus preload, alle anderen
+        beim ersten Zugriff; on_agent_loaded laeuft fuer jeden geladenen Agenten.
 
         Args:
             agents_dir: Pfad zum agents/ Verzeichnis
+            preload: Ordnernamen der Agenten die direkt beim Start geladen werden
         """
         if not os.path.isdir(agents_dir):
             logger.warning(f"Agents-Verzeichnis nicht gefunden: {agents_dir}")
@@ -128,29 +145,47 @@ class AgentRegistry:
             if not os.path.exists(agent_file):
                 continue
 
-            try:
-                # Modul dynamisch laden
-                module_name = f"agents.{entry}.agent"
-                spec = importlib.util.spec_from_file_location(module_name, agent_file)
-                module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)
-
-                # create_agent() Funktion aufrufen
-                if hasattr(module, "create_agent"):
-                    agent = module.create_agent()
-                    if isinstance(agent, BaseAgent):
-                        self.register(agent)
-                    else:
-                        logger.warning(
-                            f"create_agent() in {entry} gibt keinen BaseAgent zurueck"
-                        )
+            self._pending[entry] = agent_file
+
+        for entry in preload:
+            self._load_agent(entry)
+
+    def _load_all_pending(self):
+        """Importiert alle noch ausstehenden Agenten."""
+        for entry in list(self._pending):
+            self._load_agent(entry)
+
+    def _load_agent(self, entry: str):
+        """Importiert einen entdeckten Agenten und registriert ihn."""
+        agent_file = self._pending.pop(entry, None)
+        if agent_file is None:
+            return
+
+        try:
+            # Modul dynamisch laden
+            module_name = f"agents.{entry}.agent"
+            spec = importlib.util.spec_from_file_location(module_name, agent_file)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+
+            # create_agent() Funktion aufrufen
+            if hasattr(module, "create_agent"):
+                agent = module.create_agent()
+                if isinstance(agent, BaseAgent):
+                    self.register(agent)
+                    if self.on_agent_loaded:
+                        self.on_agent_loaded(agent)
                 else:
-                    logger.warning(f"Keine create_agent() Funktion in {entry}/agent.py")
+                    logger.warning(
+                        f"create_agent() in {entry} gibt keinen BaseAgent zurueck"
+                    )
+            else:
+                logger.warning(f"Keine create_agent() Funktion in {entry}/agent.py")
 
-            except Exception as e:
-                logger.error(f"Fehler beim Laden von Agent '{entry}': {e}")
+        except Exception as e:
+            logger.error(f"Fehler beim Laden von Agent '{entry}': {e}")
 
     @property
     def count(self) -> int:
-        """Anzahl registrierter Agenten."""
-        return len(self._agents)
+        """Anzahl entdeckter Agenten (geladene und ausstehende)."""
+        return len(self._agents) + len(self._pending)
@@ -6,10 +6,14 @@ Tools und Instructions kommen vom aktiven Agent (nicht hardcoded).
 """
 
 import asyncio
-import base64
-import json
+import binascii
 import logging
-from typing import Callable, Optional
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+import orjson
+from aiohttp import WSMsgType
 
 from core.app.config import settings
 
@@ -28,6 +32,38 @@ MODEL_MAP = {
     "premium": MODEL_PREMIUM,
 }
 
+# Modell-ID -> Kurzname (einmalig beim Import berechnet)
+MODEL_MAP_INVERSE = {v: k for k, v in MODEL_MAP.items()}
+
+# Audio-Delta Fast-Path: haeufigstes Event (~50/s), wird ohne JSON-Parsing verarbeitet.
+# Die API sendet kompaktes JSON mit "type" als erstem Key.
+_AUDIO_DELTA_PREFIX = '{"type":"response.audio.delta"'
+_AUDIO_DELTA_KEY = '"delta":"'
+
+# Events die nicht geloggt werden (zu haeufig) bzw. mit Details geloggt werden
+_NOISY_EVENTS = frozenset({"response.audio.delta"})
+_FUNCTION_EVENTS = frozenset({
+    "response.function_call_arguments.delta",
+    "response.function_call_arguments.done",
+})
+
+# input_audio_buffer.append als vorgefertigtes Frame-Template
+_AUDIO_APPEND_PREFIX = b'{"type":"input_audio_buffer.append","audio":"'
+_AUDIO_APPEND_SUFFIX = b'"}'
+
+# Haeufige Steuer-Events ohne Parameter: einmal serialisiert
+_RESPONSE_CANCEL = orjson.dumps({"type": "response.cancel"}).decode()
+_RESPONSE_CREATE = orjson.dumps({"type": "response.create"}).decode()
+
+
+@dataclass(frozen=True, slots=True)
+class Usage:
+    """Kumulierter Token-Verbrauch eines Calls (unveraenderlich, wird ohne Kopie weitergereicht)."""
+    input_text_tokens: int = 0
+    input_audio_tokens: int = 0
+    output_text_tokens: int = 0
+    output_audio_tokens: int = 0
+
 
 class VoiceClient:
     """
@@ -39,6 +75,12 @@ class VoiceClient:
 
     INPUT_SAMPLE_RATE = 16000   # AI erwartet 16kHz
     OUTPUT_SAMPLE_RATE = 24000  # AI sendet 24kHz
+    AUDIO_BATCH_INTERVAL = 0.06  # Sekunden: Mic-Chunks werden pro Fenster gebuendelt
+    RECEIVE_SHUTDOWN_TIMEOUT = 2.0  # Sekunden: max. Wartezeit auf Ende des Receive-Loops
+    STATE_NOTIFY_INTERVAL = 0.05  # Sekunden: AI-State-Wechsel werden gebuendelt gemeldet
+    USAGE_NOTIFY_INTERVAL = 0.5  # Sekunden: max. ein Usage-Update pro Intervall
+    SESSION_READY_TIMEOUT = 2.0  # Sekunden: max. Wartezeit auf session.updated nach Model-Switch
+    HEARTBEAT_INTERVAL = 20.0  # Sekunden: WebSocket-Ping, erkennt halb-offene Verbindungen
 
     REALTIME_BASE_URL = "wss://api.openai.com/v1/realtime?model="
 
@@ -49,22 +91,37 @@ class VoiceClient:
         self._running = False
         self._receive_task: Optional[asyncio.Task] = None
 
+        # Outbound-Audio: Puffer + Sender-Task buendeln Mic-Chunks
+        self._audio_accum = bytearray()
+        self._audio_pending = asyncio.Event()
+        self._audio_send_task: Optional[asyncio.Task] = None
+        self._audio_chunk_count = 0  # Empfangene Audio-Deltas (fuer Erst-Chunk-Log)
+        self._sent_audio_count = 0  # Gesendete Mic-Chunks (fuer Erst-Chunk-Log)
+
         self.muted = False
         self._model = DEFAULT_MODEL
-        self._response_in_progress = False  # Finding #4: Response-Status tracken
+        # Finding #4: Response-Status tracken. Gesetztes Event = keine Response aktiv,
+        # damit auf das Ende einer Response gewartet werden kann statt zu pollen.
+        self._response_done_event = asyncio.Event()
+        self._response_done_event.set()
         self._unmute_after_response = False  # Security Gate: Nach AI-Response auto-unmute
         self._text_only = False  # Security Gate: Nur Text-Modus (kein Audio-Output)
         self._bot_paused = False  # Bot Stop/Start: AI komplett pausieren
+        # Gesetzt sobald der Server die Session-Konfiguration bestaetigt (session.updated)
+        self._session_ready = asyncio.Event()
 
         # AI State Tracking
         self._ai_state = "idle"
+        self._notified_ai_state = "idle"
+        self._state_notify_handle: Optional[asyncio.TimerHandle] = None
+        self._state_notify_task: Optional[asyncio.Task] = None
         self._current_response_has_audio = False
-        self._usage = {
-            "input_text_tokens": 0,
-            "input_audio_tokens": 0,
-            "output_text_tokens": 0,
-            "output_audio_tokens": 0,
-        }
+        self._last_usage_notify = 0.0
+        self._usage_notify_handle: Optional[asyncio.TimerHandle] = None
+        self._usage_notify_task: Optional[asyncio.Task] = None
+        # Fire-and-forget Tasks (z.B. Schliessen der alten Verbindung): Referenz halten bis fertig
+        self._background_tasks: set[asyncio.Task] = set()
+        self._usage = Usage()
 
         # Tools und Instructions kommen vom AgentManager
         self._tools: list[dict] = []
@@ -80,6 +137,21 @@ class VoiceClient:
         self.on_usage_update: Optional[Callable] = None
         self.on_model_changed: Optional[Callable] = None
 
+        # Event-Dispatch: event_type -> Handler (ein Dict-Lookup statt elif-Kette)
+        self._event_handlers: dict[str, Callable[[dict], Awaitable[None]]] = {
+            "session.updated": self._on_session_updated,
+            "response.created": self._on_response_created,
+            "response.done": self._on_response_done,
+            "response.audio.delta": self._on_audio_delta,
+            "input_audio_buffer.speech_started": self._on_speech_started,
+            "input_audio_buffer.speech_stopped": self._on_speech_stopped,
+            "conversation.item.input_audio_transcription.completed": self._on_input_transcription_completed,
+            "response.audio_transcript.delta": self._on_audio_transcript_delta,
+            "response.audio_transcript.done": self._on_audio_transcript_done,
+            "error": self._on_error,
+            "response.function_call_arguments.done": self._handle_function_call,
+        }
+
     @property
     def model(self) -> str:
         """Aktuelles Modell."""
@@ -94,6 +166,18 @@ class VoiceClient:
         logger.warning(f"Unbekanntes Modell: {model}")
         return False
 
+    @property
+    def _response_in_progress(self) -> bool:
+        """Laeuft gerade eine AI-Response?"""
+        return not self._response_done_event.is_set()
+
+    @_response_in_progress.setter
+    def _response_in_progress(self, value: bool):
+        if value:
+            self._response_done_event.clear()
+        else:
+            self._response_done_event.set()
+
     @property
     def bot_paused(self) -> bool:
         """Ist der Bot pausiert (Bot Stop aktiv)?"""
@@ -108,7 +192,7 @@ class VoiceClient:
         # Laufende Response abbrechen
         if self._ws and self._running and self._response_in_progress:
             try:
-                await self._ws.send_str(json.dumps({"type": "response.cancel"}))
+                await self._ws.send_str(_RESPONSE_CANCEL)
                 logger.info("[BotPause] Laufende Response gecancelt")
             except Exception as e:
                 logger.warning(f"[BotPause] Cancel fehlgeschlagen: {e}")
@@ -126,7 +210,10 @@ class VoiceClient:
         """
         Wechselt das Modell waehrend eines laufenden Anrufs.
 
-        Erfordert Disconnect+Reconnect da das Modell in der WebSocket-URL steckt.
+        Das Modell steckt in der WebSocket-URL, daher wird eine neue Verbindung
+        benoetigt. Diese wird ueber die bestehende ClientSession (Connection-Pool)
+        aufgebaut und konfiguriert, bevor die alte abgeloest wird - Audio faellt
+        nur im Moment des Umschaltens aus.
         Usage wird NICHT zurueckgesetzt (Kosten akkumulieren weiter).
 
         Args:
@@ -143,33 +230,36 @@ class VoiceClient:
             logger.info(f"Modell {model} bereits aktiv")
             return True
 
-        old_model = self._model
-        self._model = model
-
-        # Usage vor Disconnect sichern (disconnect wuerde sie resetten)
-        saved_usage = dict(self._usage)
+        if not self._session or not self._running:
+            logger.warning("Model Live-Switch ohne aktive Verbindung nicht moeglich")
+            return False
 
+        old_model = self._model
         logger.info(f"Model Live-Switch: {old_model} -> {model}")
 
-        # Disconnect (ohne Usage-Reset)
-        await self.disconnect()
-
-        # Usage wiederherstellen
-        self._usage = saved_usage
+        # 1. Neue Verbindung aufbauen und konfigurieren, alte laeuft weiter
+        try:
+            new_ws = await self._open_ws(model)
+            await self._configure_session(new_ws)
+        except Exception as e:
+            logger.error(f"Model Live-Switch fehlgeschlagen, bleibe bei {old_model}: {e}")
+            return False
 
-        # Reconnect mit neuem Modell (tools/instructions sind in self gespeichert)
-        await self.connect()
+        # 2. Umschalten: alter Receive-Loop endet, sobald er den Wechsel bemerkt
+        old_ws, self._ws = self._ws, new_ws
+        self._model = model
+        self._response_in_progress = False
+        self._receive_task = asyncio.create_task(self._receive_loop())
+        await self._set_ai_state("listening")
 
-        # Usage nochmal wiederherstellen (connect resettet sie)
-        self._usage = saved_usage
+        # 3. Alte Verbindung im Hintergrund schliessen
+        if old_ws:
+            task = asyncio.create_task(old_ws.close())
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
 
         if self.on_model_changed:
-            # Kurzname ermitteln
-            short_name = model
-            for key, val in MODEL_MAP.items():
-                if val == model:
-                    short_name = key
-                    break
+            short_name = MODEL_MAP_INVERSE.get(model, model)
             await self.on_model_changed(short_name)
 
         logger.info(f"Model Live-Switch abgeschlossen: {model}")
@@ -190,11 +280,56 @@ class VoiceClient:
         logger.info(f"VoiceClient konfiguriert: {len(tools)} Tools, {len(instructions)} Zeichen Instructions, text_only={text_only}")
 
     async def _set_ai_state(self, state: str):
-        """Setzt den AI-Status und benachrichtigt Listener."""
+        """
+        Setzt den AI-Status und benachrichtigt Listener.
+
+        Schnelle Wechsel (listening -> user_speaking -> thinking -> speaking)
+        werden pro STATE_NOTIFY_INTERVAL zu einer Benachrichtigung mit dem
+        letzten Status zusammengefasst.
+        """
         if state != self._ai_state:
             self._ai_state = state
-            if self.on_ai_state_changed:
-                await self.on_ai_state_changed(state)
+            if self.on_ai_state_changed and self._state_notify_handle is None:
+                self._state_notify_handle = asyncio.get_running_loop().call_later(
+                    self.STATE_NOTIFY_INTERVAL, self._flush_ai_state
+                )
+
+    def _flush_ai_state(self):
+        """Sendet den zuletzt gesetzten AI-Status (Timer-Callback)."""
+        self._state_notify_handle = None
+        if self._ai_state != self._notified_ai_state and self.on_ai_state_changed:
+            self._notified_ai_state = self._ai_state
+            self._state_notify_task = asyncio.create_task(self.on_ai_state_changed(self._ai_state))
+
+    async def _notify_usage(self):
+        """Usage-Update senden, hoechstens einmal pro USAGE_NOTIFY_INTERVAL."""
+        if not self.on_usage_update or self._usage_notify_handle is not None:
+            return  # Nachzuegler-Update ist bereits geplant
+
+        loop = asyncio.get_running_loop()
+        wait = self._last_usage_notify + self.USAGE_NOTIFY_INTERVAL - loop.time()
+        if wait <= 0:
+            self._last_usage_notify = loop.time()
+            await self.on_usage_update(self._usage)
+        else:
+            self._usage_notify_handle = loop.call_later(wait, self._flush_usage_later)
+
+    def _flush_usage_later(self):
+        """Timer-Callback: geplantes Usage-Update senden."""
+        self._usage_notify_handle = None
+        self._last_usage_notify = asyncio.get_running_loop().time()
+        if self.on_usage_update:
+            self._usage_notify_task = asyncio.create_task(self.on_usage_update(self._usage))
+
+    async def flush_usage(self):
+        """Sendet ein noch ausstehendes Usage-Update sofort (z.B. vor dem Speichern der Call-Kosten)."""
+        if self._usage_notify_handle is None:
+            return
+        self._usage_notify_handle.cancel()
+        self._usage_notify_handle = None
+        self._last_usage_notify = asyncio.get_running_loop().time()
+        if self.on_usage_update:
+            await self.on_usage_update(self._usage)
 
     @property
     def is_connected(self) -> bool:
@@ -204,32 +339,22 @@ class VoiceClient:
     async def connect(self):
         """Verbindung zur Realtime API aufbauen."""
         try:
-            import aiohttp
-
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "OpenAI-Beta": "realtime=v1"
-            }
-
-            realtime_url = f"{self.REALTIME_BASE_URL}{self._model}"
             logger.info(f"Verbinde zu OpenAI mit Modell: {self._model}")
 
-            session = aiohttp.ClientSession()
-            self._ws = await session.ws_connect(realtime_url, headers=headers)
-            self._session = session
+            self._session = aiohttp.ClientSession()
+            self._ws = await self._open_ws(self._model)
             self._running = True
 
             await self._configure_session()
 
             self._receive_task = asyncio.create_task(self._receive_loop())
 
+            self._audio_accum.clear()
+            self._audio_pending.clear()
+            self._audio_send_task = asyncio.create_task(self._audio_sender_loop())
+
             # Reset usage fuer neuen Call
-            self._usage = {
-                "input_text_tokens": 0,
-                "input_audio_tokens": 0,
-                "output_text_tokens": 0,
-                "output_audio_tokens": 0,
-            }
+            self._usage = Usage()
             await self._set_ai_state("listening")
 
             logger.info("OpenAI Realtime API verbunden")
@@ -238,9 +363,25 @@ class VoiceClient:
             logger.error(f"OpenAI Verbindung fehlgeschlagen: {e}")
             self._running = False
 
-    async def _configure_session(self):
+    async def _open_ws(self, model: str):
+        """Oeffnet eine Realtime-WebSocket fuer das Modell ueber die bestehende Session."""
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "OpenAI-Beta": "realtime=v1"
+        }
+        realtime_url = f"{self.REALTIME_BASE_URL}{model}"
+        return await self._session.ws_connect(
+            realtime_url, headers=headers, autoping=True, heartbeat=self.HEARTBEAT_INTERVAL
+        )
+
+    async def _send_event(self, event: dict, ws=None):
+        """Sendet ein Client-Event als Text-Frame (orjson, die API erwartet Text)."""
+        await (ws or self._ws).send_str(orjson.dumps(event).decode())
+
+    async def _configure_session(self, ws=None):
         """Session mit Instruktionen und Tools konfigurieren."""
-        if not self._ws:
+        ws = ws or self._ws
+        if not ws:
             return
 
         # Security Agent: text-only Modus verhindert Audio-Output strukturell
@@ -270,7 +411,8 @@ class VoiceClient:
         }
         logger.info(f"Session modalities: {modalities}")
 
-        await self._ws.send_str(json.dumps(config))
+        self._session_ready.clear()
+        await self._send_event(config, ws)
         logger.info(f"Session konfiguriert mit {len(self._tools)} Tools")
 
     async def update_session(self, tools: list[dict] = None, instructions: str = None, text_only: bool = None):
@@ -301,7 +443,7 @@ class VoiceClient:
                 "type": "session.update",
                 "session": session_update
             }
-            await self._ws.send_str(json.dumps(config))
+            await self._send_event(config)
             logger.info(f"Session aktualisiert (text_only={self._text_only})")
 
     async def trigger_greeting(self):
@@ -315,43 +457,57 @@ class VoiceClient:
 
         try:
             self._response_in_progress = True
-            await self._ws.send_str(json.dumps({
-                "type": "response.create"
-            }))
+            await self._ws.send_str(_RESPONSE_CREATE)
             logger.info("[OpenAI] Begruessung ausgeloest")
         except Exception as e:
             self._response_in_progress = False
             logger.error(f"Fehler beim Ausloesen der Begruessung: {e}")
 
     async def _receive_loop(self):
-        """Empfaengt Events von der Realtime API."""
-        if not self._ws:
+        """
+        Empfaengt Events von der Realtime API.
+
+        Der Loop gehoert zu genau einem WebSocket und endet von selbst,
+        sobald dieser geschlossen wird.
+        """
+        ws = self._ws
+        if not ws:
             return
 
         try:
-            async for msg in self._ws:
-                if not self._running:
+            async for msg in ws:
+                # Beenden bei Disconnect oder wenn ein Model-Switch uns abgeloest hat
+                if not self._running or ws is not self._ws:
                     break
 
-                if msg.type == 1:  # TEXT
+                if msg.type is WSMsgType.TEXT:
+                    data = msg.data
+                    # Fast-Path: Audio-Delta direkt aus dem Frame schneiden
+                    if data.startswith(_AUDIO_DELTA_PREFIX):
+                        start = data.find(_AUDIO_DELTA_KEY)
+                        if start != -1:
+                            start += len(_AUDIO_DELTA_KEY)
+                            end = data.find('"', start)
+                            if end != -1:
+                                await self._handle_audio_delta(data[start:end])
+                                continue
                     try:
-                        event = json.loads(msg.data)
+                        event = orjson.loads(data)
                         await self._handle_event(event)
-                    except json.JSONDecodeError:
+                    except orjson.JSONDecodeError:
                         logger.warning("Ungueltiges JSON von API")
-                elif msg.type == 258:  # CLOSED
+                elif msg.type is WSMsgType.CLOSED:
                     break
-                elif msg.type == 256:  # ERROR
+                elif msg.type is WSMsgType.ERROR:
                     logger.error(f"WebSocket Fehler: {msg.data}")
                     break
 
         except Exception as e:
             logger.error(f"Receive Loop Fehler: {e}")
         finally:
-            # Nur _running=False setzen wenn WIR der aktive Receive-Loop sind.
-            # Bei Model-Switch wurde bereits ein neuer Loop gestartet -
-            # der alte darf _running nicht auf False setzen.
-            if self._receive_task is asyncio.current_task():
+            # Nur _running=False setzen wenn unser WebSocket noch der aktive ist.
+            # Bei Model-Switch laeuft bereits eine neue Verbindung.
+            if ws is self._ws:
                 self._running = False
 
     async def _handle_event(self, event: dict):
@@ -359,115 +515,138 @@ class VoiceClient:
         event_type = event.get("type", "")
 
         # Log alle Events (ausser audio.delta wegen Menge)
-        if event_type not in ["response.audio.delta"]:
-            logger.info(f"[OpenAI Event] {event_type}")
-            if "function" in event_type or "tool" in event_type:
-                logger.info(f"[OpenAI Event Details] {json.dumps(event, ensure_ascii=False)[:500]}")
+        if event_type not in _NOISY_EVENTS:
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"[OpenAI Event] {event_type}")
+                if event_type in _FUNCTION_EVENTS:
+                    logger.info(f"[OpenAI Event Details] {orjson.dumps(event).decode()[:500]}")
 
             if self.on_debug_event:
                 await self.on_debug_event(event_type, event)
 
-        # --- Response Lifecycle Tracking (Finding #4) ---
-        if event_type == "response.created":
-            self._response_in_progress = True
-            self._current_response_has_audio = False
+        handler = self._event_handlers.get(event_type)
+        if handler:
+            await handler(event)
 
-            # Bot Pause: Jede neue Response sofort abbrechen
-            if self._bot_paused:
-                try:
-                    await self._ws.send_str(json.dumps({"type": "response.cancel"}))
-                    logger.info("[BotPause] Response automatisch gecancelt")
-                except Exception as e:
-                    logger.warning(f"[BotPause] Auto-Cancel fehlgeschlagen: {e}")
-                return
+    async def _on_session_updated(self, event: dict):
+        self._session_ready.set()
+
+    # --- Response Lifecycle Tracking (Finding #4) ---
+
+    async def _on_response_created(self, event: dict):
+        """Neue Response gestartet."""
+        self._response_in_progress = True
+        self._current_response_has_audio = False
 
-        elif event_type == "response.done":
+        # Bot Pause: Jede neue Response sofort abbrechen
+        if self._bot_paused:
+            try:
+                await self._ws.send_str(_RESPONSE_CANCEL)
+                logger.info("[BotPause] Response automatisch gecancelt")
+            except Exception as e:
+                logger.warning(f"[BotPause] Auto-Cancel fehlgeschlagen: {e}")
+
+    async def _on_response_done(self, event: dict):
+        """Response abgeschlossen: Usage erfassen, Status zuruecksetzen."""
+        self._response_in_progress = False
+        # Security Gate: Auto-unmute nach stummer AI-Response
+        if self._unmute_after_response:
+            self.muted = False
+            self._unmute_after_response = False
+            logger.info("[OpenAI] Auto-unmute nach Security-Response")
+
+        # Usage tracking
+        response_data = event.get("response", {})
+        usage = response_data.get("usage", {})
+        if usage:
+            input_details = usage.get("input_token_details", {})
+            output_details = usage.get("output_token_details", {})
+            prev = self._usage
+            self._usage = Usage(
+                prev.input_text_tokens + input_details.get("text_tokens", 0),
+                prev.input_audio_tokens + input_details.get("audio_tokens", 0),
+                prev.output_text_tokens + output_details.get("text_tokens", 0),
+                prev.output_audio_tokens + output_details.get("audio_tokens", 0),
+            )
+            await self._notify_usage()
+
+        await self._set_ai_state("listening")
+
+    # --- Audio Events ---
+
+    async def _on_audio_delta(self, event: dict):
+        """Audio-Chunk (Slow-Path, falls der Fast-Path nicht greift)."""
+        await self._handle_audio_delta(event.get("delta", ""))
+
+    # --- Speech Detection ---
+
+    async def _on_speech_started(self, event: dict):
+        """Anrufer spricht - Barge-In."""
+        logger.info("[OpenAI] Sprache erkannt - Interruption")
+        self._response_in_progress = False  # Interruption beendet laufende Response
+        # Security Gate: Auto-unmute bei Interruption
+        if self._unmute_after_response:
+            self.muted = False
+            self._unmute_after_response = False
+        await self._set_ai_state("user_speaking")
+        if self.on_interruption:
+            await self.on_interruption()
+
+    async def _on_speech_stopped(self, event: dict):
+        """Anrufer hat aufgehoert zu sprechen."""
+        logger.info("[OpenAI] Sprache beendet")
+        await self._set_ai_state("thinking")
+
+    # --- Transcription ---
+
+    async def _on_input_transcription_completed(self, event: dict):
+        """Transkript des Anrufers (final)."""
+        text = event.get("transcript", "")
+        if text and self.on_transcript:
+            await self.on_transcript("caller", text, True)
+
+    async def _on_audio_transcript_delta(self, event: dict):
+        """Teil-Transkript der AI."""
+        text = event.get("delta", "")
+        if text and self.on_transcript:
+            await self.on_transcript("assistant", text, False)
+
+    async def _on_audio_transcript_done(self, event: dict):
+        """Transkript der AI (final)."""
+        text = event.get("transcript", "")
+        if text and self.on_transcript:
+            await self.on_transcript("assistant", text, True)
+
+    # --- Errors ---
+
+    async def _on_error(self, event: dict):
+        """API-Fehler."""
+        error = event.get("error", {})
+        logger.error(f"[OpenAI] API Error: {error}")
+        # Bei Error ist die Response auch nicht mehr aktiv
+        if "already has an active response" in str(error):
+            logger.warning("[OpenAI] Response war noch aktiv - warte auf Abschluss")
+        else:
             self._response_in_progress = False
-            # Security Gate: Auto-unmute nach stummer AI-Response
-            if self._unmute_after_response:
-                self.muted = False
-                self._unmute_after_response = False
-                logger.info("[OpenAI] Auto-unmute nach Security-Response")
-
-            # Usage tracking
-            response_data = event.get("response", {})
-            usage = response_data.get("usage", {})
-            if usage:
-                input_details = usage.get("input_token_details", {})
-                output_details = usage.get("output_token_details", {})
-                self._usage["input_text_tokens"] += input_details.get("text_tokens", 0)
-                self._usage["input_audio_tokens"] += input_details.get("audio_tokens", 0)
-                self._usage["output_text_tokens"] += output_details.get("text_tokens", 0)
-                self._usage["output_audio_tokens"] += output_details.get("audio_tokens", 0)
-                if self.on_usage_update:
-                    await self.on_usage_update(dict(self._usage))
 
-            await self._set_ai_state("listening")
+    async def _handle_audio_delta(self, audio_b64: str):
+        """Audio-Chunk (base64) dekodieren und an den Consumer weiterreichen."""
+        if not audio_b64 or self.muted:
+            return
 
-        # --- Audio Events ---
-        elif event_type == "response.audio.delta":
-            audio_b64 = event.get("delta", "")
-            if audio_b64 and not self.muted:
-                audio_bytes = base64.b64decode(audio_b64)
-
-                if not self._current_response_has_audio:
-                    self._current_response_has_audio = True
-                    await self._set_ai_state("speaking")
-
-                if not hasattr(self, '_audio_chunk_count'):
-                    self._audio_chunk_count = 0
-                self._audio_chunk_count += 1
-                if self._audio_chunk_count == 1:
-                    logger.info(f"[OpenAI] Erstes Audio-Chunk empfangen, size={len(audio_bytes)}")
-
-                if self.on_audio_response:
-                    await self.on_audio_response(audio_bytes)
-
-        # --- Speech Detection ---
-        elif event_type == "input_audio_buffer.speech_started":
-            logger.info("[OpenAI] Sprache erkannt - Interruption")
-            self._response_in_progress = False  # Interruption beendet laufende Response
-            # Security Gate: Auto-unmute bei Interruption
-            if self._unmute_after_response:
-                self.muted = False
-                self._unmute_after_response = False
-            await self._set_ai_state("user_speaking")
-            if self.on_interruption:
-                await self.on_interruption()
-
-        elif event_type == "input_audio_buffer.speech_stopped":
-            logger.info("[OpenAI] Sprache beendet")
-            await self._set_ai_state("thinking")
+        # binascii direkt: spart die str->bytes Kopie von base64.b64decode
+        audio_bytes = binascii.a2b_base64(audio_b64)
+
+        if not self._current_response_has_audio:
+            self._current_response_has_audio = True
+            await self._set_ai_state("speaking")
+
+        self._audio_chunk_count += 1
+        if self._audio_chunk_count == 1:
+            logger.info(f"[OpenAI] Erstes Audio-Chunk empfangen, size={len(audio_bytes)}")
 
-        # --- Transcription ---
-        elif event_type == "conversation.item.input_audio_transcription.completed":
-            text = event.get("transcript", "")
-            if text and self.on_transcript:
-                await self.on_transcript("caller", text, True)
-
-        elif event_type == "response.audio_transcript.delta":
-            text = event.get("delta", "")
-            if text and self.on_transcript:
-                await self.on_transcript("assistant", text, False)
-
-        elif event_type == "response.audio_transcript.done":
-            text = event.get("transcript", "")
-            if text and self.on_transcript:
-                await self.on_transcript("assistant", text, True)
-
-        # --- Errors ---
-        elif event_type == "error":
-            error = event.get("error", {})
-            logger.error(f"[OpenAI] API Error: {error}")
-            # Bei Error ist die Response auch nicht mehr aktiv
-            if "already has an active response" in str(error):
-                logger.warning("[OpenAI] Response war noch aktiv - warte auf Abschluss")
-            else:
-                self._response_in_progress = False
-
-        # --- Function Calls ---
-        elif event_type == "response.function_call_arguments.done":
-            await self._handle_function_call(event)
+        if self.on_audio_response:
+            await self.on_audio_response(audio_bytes)
 
     async def _handle_function_call(self, event: dict):
         """
@@ -483,8 +662,8 @@ class VoiceClient:
         logger.info(f"[OpenAI] Function Call: {name}({arguments_str})")
 
         try:
-            arguments = json.loads(arguments_str)
-        except json.JSONDecodeError:
+            arguments = orjson.loads(arguments_str)
+        except orjson.JSONDecodeError:
             arguments = {}
 
         # Callback zum AgentManager - der fuehrt das Tool aus
@@ -497,7 +676,11 @@ class VoiceClient:
         if result == "__MODEL_SWITCHED__":
             logger.info("[OpenAI] Model Switch - ueberspringe Function Result, triggere Greeting")
             self._response_in_progress = False
-            await asyncio.sleep(0.3)
+            # Greeting erst wenn die neue Session konfiguriert ist
+            try:
+                await asyncio.wait_for(self._session_ready.wait(), timeout=self.SESSION_READY_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning("[OpenAI] Keine session.updated Bestaetigung - Greeting trotzdem")
             await self.trigger_greeting()
             return
 
@@ -526,7 +709,7 @@ class VoiceClient:
                     "output": result
                 }
             }
-            await self._ws.send_str(json.dumps(output_event))
+            await self._send_event(output_event)
 
             # 2. Neue Response anfordern (nur wenn keine aktiv ist)
             if self._response_in_progress:
@@ -534,15 +717,14 @@ class VoiceClient:
                     f"[OpenAI] Response noch aktiv - warte vor response.create "
                     f"(call_id={call_id})"
                 )
-                # Kurz warten bis die vorherige Response fertig ist
-                for _ in range(10):  # Max 1 Sekunde warten (vorher: 50 * 0.1 = 5s)
-                    await asyncio.sleep(0.1)
-                    if not self._response_in_progress:
-                        break
+                # Warten bis die vorherige Response fertig ist (max 1 Sekunde)
+                try:
+                    await asyncio.wait_for(self._response_done_event.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
 
             self._response_in_progress = True
-            response_event = {"type": "response.create"}
-            await self._ws.send_str(json.dumps(response_event))
+            await self._ws.send_str(_RESPONSE_CREATE)
             await self._set_ai_state("thinking")
 
             logger.info(f"[OpenAI] Function Ergebnis gesendet fuer call_id={call_id}")
@@ -564,7 +746,7 @@ class VoiceClient:
                     "output": result
                 }
             }
-            await self._ws.send_str(json.dumps(output_event))
+            await self._send_event(output_event)
             self._response_in_progress = False
             await self._set_ai_state("listening")
             logger.info(f"[OpenAI] Function Output gesendet (ohne Response) fuer call_id={call_id}")
@@ -575,27 +757,55 @@ class VoiceClient:
         """
         Audio an die API senden.
 
+        Chunks werden nur angehaengt; der Sender-Task buendelt sie zu
+        einem input_audio_buffer.append Frame pro Batch-Fenster.
+
         Args:
             audio_data: PCM16 Audio @ 16kHz
         """
         if not self._ws or not self._running or self._ws.closed:
             return
 
-        try:
-            if not hasattr(self, '_sent_audio_count'):
-                self._sent_audio_count = 0
-            self._sent_audio_count += 1
+        self._sent_audio_count += 1
+
+        if self._sent_audio_count == 1:
+            logger.info(f"[OpenAI] Erstes Audio gesendet: {len(audio_data)} bytes")
+
+        self._audio_accum.extend(audio_data)
+        self._audio_pending.set()
+
+    async def _audio_sender_loop(self):
+        """
+        Sammelt Mic-Chunks und sendet sie gebuendelt.
+
+        Nagle-artig: Der erste Chunk nach einer Pause geht sofort raus,
+        danach wird bis zum Ende des Batch-Fensters gesammelt.
+        """
+        loop = asyncio.get_running_loop()
+        last_flush = 0.0
+
+        while self._running:
+            await self._audio_pending.wait()
+
+            wait = last_flush + self.AUDIO_BATCH_INTERVAL - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
 
-            if self._sent_audio_count == 1:
-                logger.info(f"[OpenAI] Erstes Audio gesendet: {len(audio_data)} bytes")
+            # base64 direkt aus dem Puffer (Buffer-Protokoll), danach in-place leeren
+            self._audio_pending.clear()
+            frame = _AUDIO_APPEND_PREFIX + binascii.b2a_base64(self._audio_accum, newline=False) + _AUDIO_APPEND_SUFFIX
+            self._audio_accum.clear()
 
-            audio_b64 = base64.b64encode(audio_data).decode('utf-8')
+            await self._send_audio_frame(frame)
+            last_flush = loop.time()
 
-            await self._ws.send_str(json.dumps({
-                "type": "input_audio_buffer.append",
-                "audio": audio_b64
-            }))
+    async def _send_audio_frame(self, frame: bytes):
+        """Sendet ein fertiges input_audio_buffer.append Frame."""
+        if not self._ws or not self._running or self._ws.closed:
+            return
 
+        try:
+            await self._ws.send_str(frame.decode("ascii"))
         except Exception as e:
             if self._running:
                 logger.warning(f"Audio senden Fehler: {e}")
@@ -604,19 +814,29 @@ class VoiceClient:
         """Verbindung trennen."""
         self._running = False
 
-        if self._receive_task:
-            self._receive_task.cancel()
+        if self._audio_send_task:
+            self._audio_send_task.cancel()
             try:
-                await self._receive_task
+                await self._audio_send_task
             except asyncio.CancelledError:
                 pass
+            self._audio_send_task = None
 
-        if self._ws:
+        # WebSocket zuerst schliessen: der Receive-Loop endet dadurch von selbst
+        ws, self._ws = self._ws, None
+        if ws:
             try:
-                await self._ws.close()
+                await ws.close()
             except Exception:
                 pass
-            self._ws = None
+
+        # disconnect() kann innerhalb des Receive-Loops laufen (Function Call) -
+        # dann nicht auf uns selbst warten
+        receive_task, self._receive_task = self._receive_task, None
+        if receive_task and receive_task is not asyncio.current_task():
+            await asyncio.wait({receive_task}, timeout=self.RECEIVE_SHUTDOWN_TIMEOUT)
+            if not receive_task.done():
+                receive_task.cancel()
 
         if self._session:
             try:
@@ -625,6 +845,9 @@ class VoiceClient:
                 pass
             self._session = None
 
+        # Ausstehendes Usage-Update nicht verlieren
+        await self.flush_usage()
+
         # Reset state (Finding #14)
         self._audio_chunk_count = 0
         self._sent_audio_count = 0
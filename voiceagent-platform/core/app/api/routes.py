@@ -5,12 +5,22 @@ Bietet Endpoints fuer Status, Konfiguration, Call-Control,
 Tasks, Agents und Firewall.
 """
 
+import hmac
 import ipaddress
 import logging
+import re
+import sqlite3
+from bisect import bisect_right
+from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Header, HTTPException
+import orjson
+from fastapi import APIRouter, HTTPException
+from starlette.requests import Request
+from starlette.responses import Response
 
+from core.app.ai.voice_client import AVAILABLE_MODELS
 from core.app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -31,6 +41,57 @@ PRIVATE_IP_NETWORKS = [
     ipaddress.ip_network("192.168.0.0/16"),
 ]
 
+# Caller-URI Pruefung fuer private IPs (Settings aendern sich zur Laufzeit nicht)
+_SIP_PUBLIC_IP = settings.SIP_PUBLIC_IP
+_SIPGATE_RE = re.compile("sipgate", re.IGNORECASE)
+
+_TAG_ALLOWED = "allowed"
+_TAG_PRIVATE = "private"
+
+
+def _build_ranges(tagged_networks) -> dict[int, tuple[list[int], list[tuple[int, str]]]]:
+    """
+    Baut pro IP-Version sortierte Adressbereiche: Startadressen (fuer bisect)
+    und parallel dazu (Endadresse, Tag). Die Netze duerfen sich nicht ueberlappen.
+    """
+    by_version: dict[int, list[tuple[int, int, str]]] = {4: [], 6: []}
+    for network, tag in tagged_networks:
+        by_version[network.version].append(
+            (int(network.network_address), int(network.broadcast_address), tag)
+        )
+
+    ranges: dict[int, tuple[list[int], list[tuple[int, str]]]] = {}
+    for version, entries in by_version.items():
+        entries.sort()
+        ranges[version] = ([lo for lo, _, _ in entries], [(hi, tag) for _, hi, tag in entries])
+    return ranges
+
+
+# Einmalig beim Import: bisect + ein Bereichsvergleich statt Scan ueber alle Netze
+_SIP_RANGES = _build_ranges(
+    [(net, _TAG_ALLOWED) for net in ALLOWED_SIP_NETWORKS]
+    + [(net, _TAG_PRIVATE) for net in PRIVATE_IP_NETWORKS]
+)
+
+
+def _lookup_network_tag(ip) -> Optional[str]:
+    """Liefert den Tag des Netzes, in dem die IP liegt, oder None."""
+    ip_int = int(ip)
+    starts, ends = _SIP_RANGES[ip.version]
+    idx = bisect_right(starts, ip_int) - 1
+    if idx >= 0:
+        hi, tag = ends[idx]
+        if ip_int <= hi:
+            return tag
+    return None
+
+
+@lru_cache(maxsize=1024)
+def _parse_ip(ip_str: str):
+    """Geparste IP-Adresse (gecacht: SIP-Traffic kommt von wenigen Peers)."""
+    return ipaddress.ip_address(ip_str)
+
+
 # Firewall Status
 sip_firewall_enabled = True
 
@@ -46,17 +107,17 @@ def is_ip_allowed(ip_str: str, caller_uri: str = None) -> bool:
         return False
 
     try:
-        ip = ipaddress.ip_address(ip_str)
+        tag = _lookup_network_tag(_parse_ip(ip_str))
 
-        for network in ALLOWED_SIP_NETWORKS:
-            if ip in network:
-                return True
+        if tag == _TAG_ALLOWED:
+            return True
 
         # Private IP: Erlauben wenn Caller-URI passend
-        if any(ip in net for net in PRIVATE_IP_NETWORKS):
+        if tag == _TAG_PRIVATE:
+            # Erst der allokationsfreie Substring-Check, dann case-insensitiv ohne .lower()-Kopie
             if caller_uri and (
-                settings.SIP_PUBLIC_IP in caller_uri
-                or "sipgate" in caller_uri.lower()
+                _SIP_PUBLIC_IP in caller_uri
+                or _SIPGATE_RE.search(caller_uri)
             ):
                 return True
 
@@ -65,11 +126,67 @@ def is_ip_allowed(ip_str: str, caller_uri: str = None) -> bool:
         return False
 
 
-def verify_api_key(x_api_key: Optional[str] = Header(None)):
-    """API-Key Authentifizierung (optional, wenn API_KEY gesetzt)."""
-    if settings.API_KEY and settings.API_KEY != "":
-        if x_api_key != settings.API_KEY:
-            raise HTTPException(status_code=401, detail="Ungueltiger API-Key")
+class APIKeyMiddleware:
+    """
+    API-Key Authentifizierung als reine ASGI-Middleware (nur HTTP).
+
+    Wird nur installiert wenn API_KEY gesetzt ist. Dashboard-Dateien und
+    /health bleiben ohne Key erreichbar.
+    """
+
+    _UNAUTHORIZED_BODY = orjson.dumps({"detail": "Ungueltiger API-Key"})
+    _PUBLIC_PATHS = frozenset({"/", "/health"})
+    _PUBLIC_PREFIX = "/static/"
+
+    def __init__(self, app, api_key: str):
+        self.app = app
+        self._api_key = api_key.encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if path in self._PUBLIC_PATHS or path.startswith(self._PUBLIC_PREFIX):
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"x-api-key":
+                if hmac.compare_digest(value, self._api_key):
+                    await self.app(scope, receive, send)
+                    return
+                break
+
+        await send({
+            "type": "http.response.start",
+            "status": 401,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(self._UNAUTHORIZED_BODY)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": self._UNAUTHORIZED_BODY})
+
+
+def _orjson_default(obj):
+    """orjson-Fallback fuer Modelle: Pydantic (Task) und Ideen/Projekte (to_dict)."""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    raise TypeError(f"Nicht serialisierbar: {type(obj).__name__}")
+
+
+def _json_response(data) -> Response:
+    """
+    JSON-Response direkt via orjson (ohne jsonable_encoder).
+
+    Modell-Objekte duerfen direkt enthalten sein: orjson ruft den Fallback pro
+    Objekt waehrend des Serialisierens auf, ohne Zwischenliste von Dicts.
+    """
+    return Response(orjson.dumps(data, default=_orjson_default), media_type="application/json")
 
 
 def setup_routes(app_state):
@@ -77,28 +194,29 @@ def setup_routes(app_state):
     Erstellt die API-Routes mit Zugriff auf den App-State.
 
     Args:
-        app_state: Dict mit sip_client, voice_client, agent_manager, etc.
+        app_state: AppState mit sip_client, voice_client, agent_manager, etc.
     """
 
-    @router.get("/health")
-    async def health():
+    # /health und /status werden von Monitoring gepollt: als reine Starlette-Routes
+    # registriert (ohne Dependency-Injection und Response-Model-Pipeline)
+
+    async def health(request: Request) -> Response:
         """Health check."""
-        sip = app_state.get("sip_client")
-        return {
+        sip = app_state.sip_client
+        return _json_response({
             "status": "running",
             "sip_registered": sip.is_registered if sip else False,
             "call_active": sip.is_in_call if sip else False,
-        }
+        })
 
-    @router.get("/status")
-    async def get_status():
+    async def get_status(request: Request) -> Response:
         """Detaillierter Status."""
-        sip = app_state.get("sip_client")
-        voice = app_state.get("voice_client")
-        agent_mgr = app_state.get("agent_manager")
-        task_exec = app_state.get("task_executor")
+        sip = app_state.sip_client
+        voice = app_state.voice_client
+        agent_mgr = app_state.agent_manager
+        task_exec = app_state.task_executor
 
-        return {
+        return _json_response({
             "sip": {
                 "registered": sip.is_registered if sip else False,
                 "server": settings.SIP_SERVER,
@@ -120,14 +238,17 @@ def setup_routes(app_state):
             "firewall": {
                 "enabled": sip_firewall_enabled,
             },
-        }
+        })
+
+    router.add_route("/health", health, methods=["GET"], include_in_schema=False)
+    router.add_route("/status", get_status, methods=["GET"], include_in_schema=False)
 
     # ============== Call Control ==============
 
     @router.post("/call/accept")
     async def accept_call():
         """Anruf annehmen."""
-        sip = app_state.get("sip_client")
+        sip = app_state.sip_client
         if sip and sip.has_incoming_call:
             await sip.accept_call()
             return {"status": "accepted"}
@@ -136,7 +257,7 @@ def setup_routes(app_state):
     @router.post("/call/hangup")
     async def hangup_call():
         """Anruf beenden."""
-        sip = app_state.get("sip_client")
+        sip = app_state.sip_client
         if sip and sip.is_in_call:
             await sip.hangup()
             return {"status": "hungup"}
@@ -145,7 +266,7 @@ def setup_routes(app_state):
     @router.post("/ai/mute")
     async def mute_ai():
         """AI stumm schalten."""
-        voice = app_state.get("voice_client")
+        voice = app_state.voice_client
         if voice:
             voice.muted = True
             return {"status": "muted"}
@@ -154,7 +275,7 @@ def setup_routes(app_state):
     @router.post("/ai/unmute")
     async def unmute_ai():
         """AI Stummschaltung aufheben."""
-        voice = app_state.get("voice_client")
+        voice = app_state.voice_client
         if voice:
             voice.muted = False
             return {"status": "unmuted"}
@@ -165,7 +286,7 @@ def setup_routes(app_state):
     @router.get("/model")
     async def get_model():
         """Aktuelles AI-Modell abrufen."""
-        voice = app_state.get("voice_client")
+        voice = app_state.voice_client
         return {
             "model": voice.model if voice else "",
             "available_models": AVAILABLE_MODELS,
@@ -174,7 +295,7 @@ def setup_routes(app_state):
     @router.post("/model")
     async def set_model(data: dict):
         """AI-Modell setzen."""
-        voice = app_state.get("voice_client")
+        voice = app_state.voice_client
         if voice:
             model = data.get("model", "")
             if voice.set_model(model):
@@ -187,7 +308,7 @@ def setup_routes(app_state):
     @router.get("/agents")
     async def get_agents():
         """Alle verfuegbaren Agenten abrufen."""
-        agent_mgr = app_state.get("agent_manager")
+        agent_mgr = app_state.agent_manager
         if agent_mgr:
             return {
                 "agents": agent_mgr.registry.get_agent_info(),
@@ -198,13 +319,13 @@ def setup_routes(app_state):
     @router.post("/agents/switch")
     async def switch_agent(data: dict):
         """Aktiven Agent wechseln."""
-        agent_mgr = app_state.get("agent_manager")
+        agent_mgr = app_state.agent_manager
         if agent_mgr:
             agent_name = data.get("agent_name", "")
             success = await agent_mgr.switch_agent(agent_name)
             if success:
                 # Voice Client Session aktualisieren
-                voice = app_state.get("voice_client")
+                voice = app_state.voice_client
                 if voice and voice.is_connected:
                     await voice.update_session(
                         tools=agent_mgr.get_tools(),
@@ -219,16 +340,16 @@ def setup_routes(app_state):
     @router.get("/tasks")
     async def get_tasks():
         """Alle Tasks abrufen."""
-        task_store = app_state.get("task_store")
+        task_store = app_state.task_store
         if task_store:
             tasks = await task_store.get_all()
-            return {"tasks": [t.model_dump() for t in tasks]}
+            return _json_response({"tasks": tasks})
         return {"tasks": []}
 
     @router.get("/tasks/{task_id}")
     async def get_task(task_id: str):
         """Einzelnen Task abrufen."""
-        task_store = app_state.get("task_store")
+        task_store = app_state.task_store
         if task_store:
             task = await task_store.get(task_id)
             if task:
@@ -239,7 +360,7 @@ def setup_routes(app_state):
     @router.post("/tasks/{task_id}/cancel")
     async def cancel_task(task_id: str):
         """Task abbrechen."""
-        task_exec = app_state.get("task_executor")
+        task_exec = app_state.task_executor
         if task_exec:
             task = await task_exec.cancel(task_id)
             if task:
@@ -252,22 +373,18 @@ def setup_routes(app_state):
     @router.get("/ideas")
     async def get_ideas(category: str = None, status: str = None):
         """Alle Ideen abrufen, optional nach Kategorie/Status gefiltert."""
-        from agents.ideas_agent.idea_store import IdeaStore
-        db = app_state.get("db")
-        if not db:
+        store = app_state.idea_store
+        if not store:
             return {"ideas": []}
-        store = IdeaStore(db)
         ideas = await store.get_all(category=category, status=status)
-        return {"ideas": [idea.to_dict() for idea in ideas]}
+        return _json_response({"ideas": ideas})
 
     @router.get("/ideas/{idea_id}")
     async def get_idea(idea_id: str):
         """Einzelne Idee abrufen."""
-        from agents.ideas_agent.idea_store import IdeaStore
-        db = app_state.get("db")
-        if not db:
+        store = app_state.idea_store
+        if not store:
             raise HTTPException(status_code=500, detail="Datenbank nicht verfuegbar")
-        store = IdeaStore(db)
         idea = await store.get(idea_id)
         if not idea:
             raise HTTPException(status_code=404, detail="Idee nicht gefunden")
@@ -276,16 +393,14 @@ def setup_routes(app_state):
     @router.put("/ideas/{idea_id}/archive")
     async def archive_idea(idea_id: str):
         """Idee archivieren (nicht loeschen!)."""
-        from agents.ideas_agent.idea_store import IdeaStore
-        db = app_state.get("db")
-        if not db:
+        store = app_state.idea_store
+        if not store:
             raise HTTPException(status_code=500, detail="Datenbank nicht verfuegbar")
-        store = IdeaStore(db)
         idea = await store.archive(idea_id)
         if not idea:
             raise HTTPException(status_code=404, detail="Idee nicht gefunden")
 
-        ws_manager = app_state.get("ws_manager")
+        ws_manager = app_state.ws_manager
         if ws_manager:
             await ws_manager.broadcast({
                 "type": "idea_update",
@@ -300,22 +415,18 @@ def setup_routes(app_state):
     @router.get("/projects")
     async def get_projects(status: str = None):
         """Alle Projekte abrufen."""
-        from agents.ideas_agent.project_planner import ProjectPlanner
-        db = app_state.get("db")
-        if not db:
+        planner = app_state.project_planner
+        if not planner:
             return {"projects": []}
-        planner = ProjectPlanner(db)
         projects = await planner.get_all(status=status)
-        return {"projects": [p.to_dict() for p in projects]}
+        return _json_response({"projects": projects})
 
     @router.get("/projects/{project_id}")
     async def get_project(project_id: str):
         """Einzelnes Projekt abrufen."""
-        from agents.ideas_agent.project_planner import ProjectPlanner
-        db = app_state.get("db")
-        if not db:
+        planner = app_state.project_planner
+        if not planner:
             raise HTTPException(status_code=500, detail="Datenbank nicht verfuegbar")
-        planner = ProjectPlanner(db)
         project = await planner.get(project_id)
         if not project:
             raise HTTPException(status_code=404, detail="Projekt nicht gefunden")
@@ -326,10 +437,10 @@ def setup_routes(app_state):
     @router.get("/calls/history")
     async def get_call_history():
         """Alle Anrufe, neueste zuerst, mit laufendem Index."""
-        db = app_state.get("db")
+        db = app_state.db
         if not db:
             return {"calls": [], "month_cost_cents": 0}
-        calls = await db.fetch_all(
+        calls = await db.fetch_all_ro(
             """SELECT id, caller_id, started_at, ended_at,
                       duration_seconds, cost_cents
                FROM calls
@@ -338,16 +449,15 @@ def setup_routes(app_state):
                LIMIT 100"""
         )
         # Laufender Index: aeltester Call = #1
-        total = await db.fetch_one("SELECT COUNT(*) as cnt FROM calls WHERE caller_id IS NOT NULL")
+        total = await db.fetch_one_ro("SELECT COUNT(*) as cnt FROM calls WHERE caller_id IS NOT NULL")
         total_count = total["cnt"] if total else 0
         for i, call in enumerate(calls):
             call["call_index"] = total_count - i
 
         # Monatskosten (aktueller Monat)
-        from datetime import datetime
         now = datetime.utcnow()
         month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0).isoformat()
-        row = await db.fetch_one(
+        row = await db.fetch_one_ro(
             "SELECT COALESCE(SUM(cost_cents), 0) as total FROM calls WHERE started_at >= ?",
             (month_start,)
         )
@@ -355,13 +465,37 @@ def setup_routes(app_state):
 
         return {"calls": calls, "month_cost_cents": round(month_cost, 2)}
 
+    @router.get("/calls/search")
+    async def search_calls(q: str, limit: int = 50):
+        """Anrufe per Volltextsuche (FTS5) in Transcript und Logs finden."""
+        db = app_state.db
+        if not db:
+            return {"calls": []}
+        if not db.fts_enabled:
+            # SQLite ohne FTS5: kein Index vorhanden, "no such table" ist kein Fehler der Anfrage
+            raise HTTPException(status_code=503, detail="Volltextsuche nicht verfuegbar (SQLite ohne FTS5)")
+        try:
+            calls = await db.fetch_all_ro(
+                """SELECT c.id, c.caller_id, c.started_at, c.ended_at,
+                          c.duration_seconds, c.cost_cents
+                   FROM calls_fts
+                   JOIN calls c ON c.fts_rowid = calls_fts.rowid
+                   WHERE calls_fts MATCH ?
+                   ORDER BY rank
+                   LIMIT ?""",
+                (q, min(limit, 200))
+            )
+        except sqlite3.OperationalError as e:
+            raise HTTPException(status_code=400, detail=f"Ungueltige Suchanfrage: {e}")
+        return {"calls": calls}
+
     @router.get("/calls/{call_id}")
     async def get_call_detail(call_id: str):
         """Einzelnen Anruf mit Transcript abrufen."""
-        db = app_state.get("db")
+        db = app_state.db
         if not db:
             raise HTTPException(status_code=500, detail="DB nicht verfuegbar")
-        call = await db.fetch_one(
+        call = await db.fetch_one_ro(
             "SELECT * FROM calls WHERE id = ?", (call_id,)
         )
         if not call:
@@ -373,7 +507,7 @@ def setup_routes(app_state):
     @router.get("/blacklist")
     async def get_blacklist():
         """Alle geblockten Nummern abrufen."""
-        blacklist_store = app_state.get("blacklist_store")
+        blacklist_store = app_state.blacklist_store
         if blacklist_store:
             entries = await blacklist_store.get_all()
             return {"entries": entries}
@@ -382,14 +516,14 @@ def setup_routes(app_state):
     @router.post("/blacklist")
     async def add_to_blacklist(data: dict):
         """Nummer zur Blacklist hinzufuegen."""
-        blacklist_store = app_state.get("blacklist_store")
+        blacklist_store = app_state.blacklist_store
         if blacklist_store:
             caller_id = data.get("caller_id", "").strip()
             if not caller_id:
                 raise HTTPException(status_code=400, detail="caller_id fehlt")
             reason = data.get("reason", "Manuell hinzugefuegt")
             await blacklist_store.add(caller_id, reason)
-            ws_manager = app_state.get("ws_manager")
+            ws_manager = app_state.ws_manager
             if ws_manager:
                 await ws_manager.broadcast({"type": "blacklist_updated"})
             return {"status": "ok", "caller_id": caller_id}
@@ -398,11 +532,11 @@ def setup_routes(app_state):
     @router.delete("/blacklist/{caller_id:path}")
     async def remove_from_blacklist(caller_id: str):
         """Nummer von der Blacklist entfernen."""
-        blacklist_store = app_state.get("blacklist_store")
+        blacklist_store = app_state.blacklist_store
         if blacklist_store:
             removed = await blacklist_store.remove(caller_id)
             if removed:
-                ws_manager = app_state.get("ws_manager")
+                ws_manager = app_state.ws_manager
                 if ws_manager:
                     await ws_manager.broadcast({"type": "blacklist_updated"})
                 return {"status": "ok", "removed": caller_id}
@@ -414,7 +548,7 @@ def setup_routes(app_state):
     @router.get("/whitelist")
     async def get_whitelist():
         """Alle Whitelist-Nummern abrufen."""
-        blacklist_store = app_state.get("blacklist_store")
+        blacklist_store = app_state.blacklist_store
         if blacklist_store:
             entries = await blacklist_store.get_all_whitelist()
             return {"entries": entries}
@@ -423,14 +557,14 @@ def setup_routes(app_state):
     @router.post("/whitelist")
     async def add_to_whitelist(data: dict):
         """Nummer zur Whitelist hinzufuegen."""
-        blacklist_store = app_state.get("blacklist_store")
+        blacklist_store = app_state.blacklist_store
         if blacklist_store:
             caller_id = data.get("caller_id", "").strip()
             if not caller_id:
                 raise HTTPException(status_code=400, detail="caller_id fehlt")
             note = data.get("note", "")
             await blacklist_store.add_to_whitelist(caller_id, note)
-            ws_manager = app_state.get("ws_manager")
+            ws_manager = app_state.ws_manager
             if ws_manager:
                 await ws_manager.broadcast({"type": "whitelist_updated"})
             return {"status": "ok", "caller_id": caller_id}
@@ -439,11 +573,11 @@ def setup_routes(app_state):
     @router.delete("/whitelist/{caller_id:path}")
     async def remove_from_whitelist(caller_id: str):
         """Nummer von der Whitelist entfernen."""
-        blacklist_store = app_state.get("blacklist_store")
+        blacklist_store = app_state.blacklist_store
         if blacklist_store:
             removed = await blacklist_store.remove_from_whitelist(caller_id)
             if removed:
-                ws_manager = app_state.get("ws_manager")
+                ws_manager = app_state.ws_manager
                 if ws_manager:
                     await ws_manager.broadcast({"type": "whitelist_updated"})
                 return {"status": "ok", "removed": caller_id}
@@ -474,7 +608,7 @@ def setup_routes(app_state):
             f"SIP Firewall {'aktiviert' if sip_firewall_enabled else 'DEAKTIVIERT'}"
         )
 
-        ws_manager = app_state.get("ws_manager")
+        ws_manager = app_state.ws_manager
         if ws_manager:
             await ws_manager.broadcast({
                 "type": "firewall_status",
@@ -484,7 +618,3 @@ def setup_routes(app_state):
         return {"status": "ok", "enabled": sip_firewall_enabled}
 
     return router
-
-
-# Model-Import fuer direkten Zugriff
-from core.app.ai.voice_client import AVAILABLE_MODELS
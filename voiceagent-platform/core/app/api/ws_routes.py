@@ -9,9 +9,12 @@ Live-Updates fuer Dashboard/GUI:
 """
 
 import logging
+from typing import Awaitable, Callable
 
+import orjson
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
+from core.app.ai.voice_client import MODEL_MAP_INVERSE
 from core.app.ws.manager import ConnectionManager
 
 logger = logging.getLogger(__name__)
@@ -24,9 +27,54 @@ def setup_ws_routes(app_state):
     Erstellt die WebSocket-Routes mit Zugriff auf den App-State.
 
     Args:
-        app_state: Dict mit sip_client, voice_client, ws_manager, etc.
+        app_state: AppState mit sip_client, voice_client, ws_manager, etc.
     """
 
+    # ============== Client-Nachrichten ==============
+    # Komponenten werden erst im Lifespan gesetzt - daher Zugriff zur Laufzeit
+
+    async def on_accept_call(data: dict):
+        sip = app_state.sip_client
+        if sip and sip.has_incoming_call:
+            await sip.accept_call()
+
+    async def on_hangup(data: dict):
+        sip = app_state.sip_client
+        if sip and sip.is_in_call:
+            await sip.hangup()
+
+    async def on_mute_ai(data: dict):
+        voice = app_state.voice_client
+        if voice:
+            voice.muted = True
+
+    async def on_unmute_ai(data: dict):
+        voice = app_state.voice_client
+        if voice:
+            voice.muted = False
+
+    async def on_switch_agent(data: dict):
+        agent_mgr = app_state.agent_manager
+        agent_name = data.get("agent_name")
+        if agent_mgr and agent_name:
+            success = await agent_mgr.switch_agent(agent_name)
+            if success:
+                voice = app_state.voice_client
+                if voice and voice.is_connected:
+                    await voice.update_session(
+                        tools=agent_mgr.get_tools(),
+                        instructions=agent_mgr.get_instructions()
+                    )
+
+    # Nachrichten-Typ -> Handler (ein Dict-Lookup statt elif-Kette)
+    message_handlers: dict[str, Callable[[dict], Awaitable[None]]] = {
+        "accept_call": on_accept_call,
+        "hangup": on_hangup,
+        "mute_ai": on_mute_ai,
+        "unmute_ai": on_unmute_ai,
+        "switch_agent": on_switch_agent,
+    }
+
     @router.websocket("/ws")
     async def websocket_endpoint(websocket: WebSocket):
         """
@@ -42,7 +90,7 @@ def setup_ws_routes(app_state):
         - coding_progress: Claude Coding-Fortschritt
         - firewall_status: Firewall-Status
         """
-        ws_manager: ConnectionManager = app_state.get("ws_manager")
+        ws_manager: ConnectionManager = app_state.ws_manager
         if not ws_manager:
             await websocket.close()
             return
@@ -50,20 +98,14 @@ def setup_ws_routes(app_state):
         await ws_manager.connect(websocket)
 
         # Initial Status senden
-        sip = app_state.get("sip_client")
-        agent_mgr = app_state.get("agent_manager")
+        sip = app_state.sip_client
+        agent_mgr = app_state.agent_manager
 
-        voice = app_state.get("voice_client")
+        voice = app_state.voice_client
         # Aktuelles Modell als Kurzname
-        current_model = "mini"
-        if voice:
-            from core.app.ai.voice_client import MODEL_MAP
-            for key, val in MODEL_MAP.items():
-                if val == voice.model:
-                    current_model = key
-                    break
+        current_model = MODEL_MAP_INVERSE.get(voice.model, "mini") if voice else "mini"
 
-        await websocket.send_json({
+        await ws_manager.send_to(websocket, {
             "type": "status",
             "sip_registered": sip.is_registered if sip else False,
             "call_active": sip.is_in_call if sip else False,
@@ -74,38 +116,11 @@ def setup_ws_routes(app_state):
 
         try:
             while True:
-                data = await websocket.receive_json()
-                msg_type = data.get("type")
-
-                if msg_type == "accept_call":
-                    if sip and sip.has_incoming_call:
-                        await sip.accept_call()
-
-                elif msg_type == "hangup":
-                    if sip and sip.is_in_call:
-                        await sip.hangup()
-
-                elif msg_type == "mute_ai":
-                    voice = app_state.get("voice_client")
-                    if voice:
-                        voice.muted = True
-
-                elif msg_type == "unmute_ai":
-                    voice = app_state.get("voice_client")
-                    if voice:
-                        voice.muted = False
-
-                elif msg_type == "switch_agent":
-                    agent_name = data.get("agent_name")
-                    if agent_mgr and agent_name:
-                        success = await agent_mgr.switch_agent(agent_name)
-                        if success:
-                            voice = app_state.get("voice_client")
-                            if voice and voice.is_connected:
-                                await voice.update_session(
-                                    tools=agent_mgr.get_tools(),
-                                    instructions=agent_mgr.get_instructions()
-                                )
+                # Dashboard sendet Text-Frames (JSON.stringify) - orjson statt stdlib json
+                data = orjson.loads(await websocket.receive_text())
+                handler = message_handlers.get(data.get("type"))
+                if handler:
+                    await handler(data)
 
         except WebSocketDisconnect:
             ws_manager.disconnect(websocket)
@@ -6,7 +6,9 @@ Auto-Blacklist: 3 fehlgeschlagene Anrufe in 12h -> automatisch gesperrt.
 """
 
 import logging
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
+from typing import Literal
 
 from core.app.db.database import Database
 
@@ -22,14 +24,44 @@ class BlacklistStore:
 
     def __init__(self, db: Database):
         self.db = db
+        # In-Memory Caches der Rufnummern (klein, aendern sich selten).
+        # Werden beim Start per load() gefuellt und bei jeder Aenderung nachgefuehrt.
+        self._blacklist_cache: set[str] = set()
+        self._whitelist_cache: set[str] = set()
+
+    async def load(self) -> None:
+        """Laedt Black- und Whitelist in den Speicher (einmal beim Start)."""
+        self._whitelist_cache = {
+            row["caller_id"] async for row in self.db.iter_rows_raw("SELECT caller_id FROM whitelist")
+        }
+        self._blacklist_cache = {
+            row["caller_id"] async for row in self.db.iter_rows_raw("SELECT caller_id FROM blacklist")
+        }
+        logger.info(
+            f"[Blacklist] Cache geladen: {len(self._blacklist_cache)} gesperrt, "
+            f"{len(self._whitelist_cache)} Whitelist"
+        )
+
+    def admit(self, caller_id: str) -> Literal["allow", "block", "screen"]:
+        """
+        Zulassungsentscheidung fuer einen eingehenden Anruf (reine Cache-Lookups).
+
+        Whitelist hat Vorrang vor der Blacklist.
+
+        Returns:
+            "allow"  - Whitelist: Security-Code wird uebersprungen
+            "block"  - Blacklist: Anruf ablehnen
+            "screen" - Normaler Anrufer: Security Agent
+        """
+        if caller_id in self._whitelist_cache:
+            return "allow"
+        if caller_id in self._blacklist_cache:
+            return "block"
+        return "screen"
 
-    async def is_blacklisted(self, caller_id: str) -> bool:
+    def is_blacklisted(self, caller_id: str) -> bool:
         """Prueft ob eine Rufnummer gesperrt ist."""
-        row = await self.db.fetch_one(
-            "SELECT caller_id FROM blacklist WHERE caller_id = ?",
-            (caller_id,)
-        )
-        return row is not None
+        return caller_id in self._blacklist_cache
 
     async def add(self, caller_id: str, reason: str = "") -> None:
         """Fuegt eine Rufnummer zur Blacklist hinzu."""
@@ -37,25 +69,24 @@ class BlacklistStore:
             "INSERT OR REPLACE INTO blacklist (caller_id, reason, blocked_at) VALUES (?, ?, ?)",
             (caller_id, reason, datetime.utcnow().isoformat())
         )
+        self._blacklist_cache.add(caller_id)
         logger.warning(f"[Blacklist] Nummer gesperrt: {caller_id} ({reason})")
 
     async def remove(self, caller_id: str) -> bool:
         """Entfernt eine Rufnummer von der Blacklist und loescht Failed-Call-Records."""
-        row = await self.db.fetch_one(
-            "SELECT caller_id FROM blacklist WHERE caller_id = ?",
-            (caller_id,)
-        )
-        if not row:
-            return False
-        await self.db.execute(
-            "DELETE FROM blacklist WHERE caller_id = ?",
-            (caller_id,)
-        )
-        # Failed-Call-Records loeschen, damit 3 neue Fehlversuche noetig sind
-        await self.db.execute(
-            "DELETE FROM failed_unlock_calls WHERE caller_id = ?",
-            (caller_id,)
-        )
+        async with self.db.transaction():
+            cursor = await self.db.execute(
+                "DELETE FROM blacklist WHERE caller_id = ?",
+                (caller_id,)
+            )
+            if cursor.rowcount == 0:
+                return False
+            # Failed-Call-Records loeschen, damit 3 neue Fehlversuche noetig sind
+            await self.db.execute(
+                "DELETE FROM failed_unlock_calls WHERE caller_id = ?",
+                (caller_id,)
+            )
+        self._blacklist_cache.discard(caller_id)
         logger.info(f"[Blacklist] Nummer entsperrt + Failed-Calls geloescht: {caller_id}")
         return True
 
@@ -69,7 +100,7 @@ class BlacklistStore:
         """Zeichnet einen fehlgeschlagenen Anruf auf."""
         await self.db.execute(
             "INSERT INTO failed_unlock_calls (caller_id, failed_at) VALUES (?, ?)",
-            (caller_id, datetime.utcnow().isoformat())
+            (caller_id, int(time.time()))
         )
         logger.info(f"[Blacklist] Fehlgeschlagener Anruf aufgezeichnet: {caller_id}")
 
@@ -81,11 +112,12 @@ class BlacklistStore:
         Returns:
             True wenn die Nummer jetzt gesperrt wurde
         """
-        if await self.is_blacklisted(caller_id):
+        if self.is_blacklisted(caller_id):
             return False
 
-        cutoff = (datetime.utcnow() - timedelta(hours=FAILED_CALLS_WINDOW_HOURS)).isoformat()
-        row = await self.db.fetch_one(
+        # Ein Index-only COUNT ueber (caller_id, failed_at); Blacklist-Check kommt aus dem Cache
+        cutoff = int(time.time()) - FAILED_CALLS_WINDOW_HOURS * 3600
+        row = await self.db.fetch_one_raw(
             "SELECT COUNT(*) as cnt FROM failed_unlock_calls WHERE caller_id = ? AND failed_at > ?",
             (caller_id, cutoff)
         )
@@ -102,13 +134,9 @@ class BlacklistStore:
 
     # ============== Whitelist ==============
 
-    async def is_whitelisted(self, caller_id: str) -> bool:
+    def is_whitelisted(self, caller_id: str) -> bool:
         """Prueft ob eine Rufnummer auf der Whitelist steht."""
-        row = await self.db.fetch_one(
-            "SELECT caller_id FROM whitelist WHERE caller_id = ?",
-            (caller_id,)
-        )
-        return row is not None
+        return caller_id in self._whitelist_cache
 
     async def add_to_whitelist(self, caller_id: str, note: str = "") -> None:
         """Fuegt eine Rufnummer zur Whitelist hinzu."""
@@ -116,20 +144,18 @@ class BlacklistStore:
             "INSERT OR REPLACE INTO whitelist (caller_id, note, added_at) VALUES (?, ?, ?)",
             (caller_id, note, datetime.utcnow().isoformat())
         )
+        self._whitelist_cache.add(caller_id)
         logger.info(f"[Whitelist] Nummer hinzugefuegt: {caller_id}")
 
     async def remove_from_whitelist(self, caller_id: str) -> bool:
         """Entfernt eine Rufnummer von der Whitelist. Returns True wenn gefunden."""
-        row = await self.db.fetch_one(
-            "SELECT caller_id FROM whitelist WHERE caller_id = ?",
-            (caller_id,)
-        )
-        if not row:
-            return False
-        await self.db.execute(
+        cursor = await self.db.execute(
             "DELETE FROM whitelist WHERE caller_id = ?",
             (caller_id,)
         )
+        if cursor.rowcount == 0:
+            return False
+        self._whitelist_cache.discard(caller_id)
         logger.info(f"[Whitelist] Nummer entfernt: {caller_id}")
         return True
 
@@ -1,71 +1,97 @@
 #!/usr/bin/env python3
 """Zeigt Transcript und Logs fuer einen bestimmten Call (nach Index)."""
-import json
 import re
 import sqlite3
 import sys
 
+# Anzeigename aus Caller-ID: sip:"Name" <sip:...>
+_CALLER_RE = re.compile(r'"([^"]+)"')
+
+# Anzeige-Praefix je Transcript-Rolle (unbekannte Rollen werden unveraendert angezeigt)
+_ROLE_PREFIX = {"caller": "Anrufer", "user": "Anrufer", "assistant": "AI"}
+
 
 def main():
     if len(sys.argv) < 2:
         print("Verwendung: python3 call_logs.py <call_nummer>")
         sys.exit(1)
 
-    conn = sqlite3.connect("/app/data/voiceagent.db")
+    call_num = int(sys.argv[1])
+
+    # Read-only oeffnen: das CLI konkurriert nie um Locks/Checkpoints mit dem laufenden Server
+    conn = sqlite3.connect("file:/app/data/voiceagent.db?mode=ro", uri=True)
+    conn.execute("PRAGMA query_only=ON")
     conn.row_factory = sqlite3.Row
-    calls = conn.execute(
-        """SELECT id, caller_id, started_at, ended_at, duration_seconds,
-                  cost_cents, transcript, logs
-           FROM calls WHERE caller_id IS NOT NULL
-           ORDER BY started_at ASC"""
-    ).fetchall()
+    total = conn.execute(
+        "SELECT COUNT(*) FROM calls WHERE caller_id IS NOT NULL"
+    ).fetchone()[0]
 
-    call_num = int(sys.argv[1])
-    if call_num < 1 or call_num > len(calls):
-        print(f"Call #{call_num} nicht gefunden. Verfuegbar: #1 - #{len(calls)}")
+    if call_num < 1 or call_num > total:
+        print(f"Call #{call_num} nicht gefunden. Verfuegbar: #1 - #{total}")
         sys.exit(1)
 
-    c = calls[call_num - 1]
+    # Nur die eine Zeile laden (Transcripts/Logs der anderen Calls bleiben in der DB)
+    c = conn.execute(
+        """SELECT id, caller_id, started_at, ended_at, duration_seconds,
+                  cost_cents, length(logs) AS logs_len,
+                  CAST(logs AS BLOB) AS logs
+           FROM calls WHERE caller_id IS NOT NULL
+           ORDER BY started_at ASC
+           LIMIT 1 OFFSET ?""",
+        (call_num - 1,)
+    ).fetchone()
     caller = c["caller_id"] or ""
-    m = re.search(r'"([^"]+)"', caller)
+    m = _CALLER_RE.search(caller)
     if m:
         caller = m.group(1)
 
     dur = c["duration_seconds"] or 0
     cost = c["cost_cents"] or 0
-    transcript = []
-    try:
-        transcript = json.loads(c["transcript"] or "[]")
-    except Exception:
-        pass
-    logs = c["logs"] or ""
+    # Transcript-Zeilen per JSON1 (json_each) direkt in SQLite zerlegen statt in Python zu parsen;
+    # json_valid() filtert kaputte/leere Transcripts (sonst "malformed JSON")
+    transcript = conn.execute(
+        """SELECT COALESCE(json_extract(t.value, '$.role'), '?') AS role,
+                  COALESCE(json_extract(t.value, '$.text'), '') AS text
+           FROM calls, json_each(calls.transcript) AS t
+           WHERE calls.id = ? AND json_valid(calls.transcript)
+           ORDER BY t.key""",
+        (c["id"],)
+    ).fetchall()
+    # Logs als rohe UTF-8-Bytes (CAST AS BLOB): kein Decode zu str und Re-Encode bei der Ausgabe
+    logs = c["logs"] or b""
 
-    print(f"=== Call #{call_num} ===")
-    print(f"Anrufer:  {caller}")
-    print(f"Start:    {c['started_at']}")
-    print(f"Ende:     {c['ended_at'] or '(laufend)'}")
-    print(f"Dauer:    {dur}s")
-    print(f"Kosten:   {cost:.2f} ct")
-    print()
+    # Ausgabe sammeln und einmal schreiben (ein write statt einem print pro Zeile)
+    out = [
+        f"=== Call #{call_num} ===",
+        f"Anrufer:  {caller}",
+        f"Start:    {c['started_at']}",
+        f"Ende:     {c['ended_at'] or '(laufend)'}",
+        f"Dauer:    {dur}s",
+        f"Kosten:   {cost:.2f} ct",
+        "",
+    ]
 
     if transcript:
-        print(f"=== Transcript ({len(transcript)} Zeilen) ===")
-        for line in transcript:
-            role = line.get("role", "?")
-            text = line.get("text", "")
-            prefix = {"caller": "Anrufer", "user": "Anrufer", "assistant": "AI"}.get(role, role)
-            print(f"[{prefix}] {text}")
-        print()
+        out.append(f"=== Transcript ({len(transcript)} Zeilen) ===")
+        for role, text in transcript:
+            out.append(f"[{_ROLE_PREFIX.get(role, role)}] {text}")
+        out.append("")
     else:
-        print("=== Transcript: (leer) ===")
-        print()
+        out.append("=== Transcript: (leer) ===")
+        out.append("")
 
     if logs:
-        print(f"=== Logs ({len(logs)} Zeichen) ===")
-        print(logs)
+        out.append(f"=== Logs ({c['logs_len']} Zeichen) ===")
     else:
-        print("=== Logs: (leer) ===")
+        out.append("=== Logs: (leer) ===")
 
+    # Direkt in den Byte-Puffer schreiben (am TextIOWrapper vorbei)
+    stdout = sys.stdout.buffer
+    stdout.write(("\n".join(out) + "\n").encode("utf-8"))
+    if logs:
+        stdout.write(logs)
+        stdout.write(b"\n")
+    stdout.flush()
 
 if __name__ == "__main__":
     main()
@@ -2,6 +2,8 @@
 VoiceAgent Platform - Zentrale Konfiguration
 """
 
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings
 
 
@@ -31,6 +33,8 @@ class Settings(BaseSettings):
     SAMPLE_RATE_SIP: int = 48000   # PJSIP mit Opus
     SAMPLE_RATE_AI_INPUT: int = 16000   # OpenAI Input
     SAMPLE_RATE_AI_OUTPUT: int = 24000  # OpenAI Output
+    # SIP-Frames (je 20ms) pro Resample-/Sende-Block Richtung AI; >1 spart Aufrufe, kostet Latenz
+    RESAMPLE_BATCH_FRAMES: int = 1
 
     # Agents
     AGENTS_DIR: str = "/app/agents"
@@ -45,12 +49,12 @@ class Settings(BaseSettings):
     # Claude Coding Agent (CLI mit MAX Account)
     CLAUDE_MODEL: str = "claude-opus-4-6"
     CLAUDE_MAX_TURNS: int = 50  # Max Iterationen pro Aufgabe
-    CLAUDE_ALLOWED_TOOLS: list[str] = [
+    CLAUDE_ALLOWED_TOOLS: frozenset[str] = frozenset({
         "Read", "Edit", "Write", "Glob", "Grep",
         "Bash(python *)", "Bash(npm *)", "Bash(node *)",
         "Bash(pip install *)", "Bash(pytest *)", "Bash(git *)",
         "Bash(ls *)", "Bash(mkdir *)", "Bash(cat *)",
-    ]
+    })
 
     # Logging
     LOG_LEVEL: str = "INFO"
@@ -61,4 +65,14 @@ class Settings(BaseSettings):
         env_file_encoding = "utf-8"
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Settings beim ersten Zugriff laden (.env lesen + validieren), danach gecacht."""
+    return Settings()
+
+
+def __getattr__(name: str):
+    # Lazy Modul-Attribut: "from core.app.config import settings" funktioniert weiterhin
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
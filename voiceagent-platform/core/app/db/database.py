@@ -3,18 +3,40 @@ SQLite Datenbank-Layer mit aiosqlite.
 """
 
 import asyncio
-import json
 import logging
 import os
 import sqlite3
-from typing import Any, Optional
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Optional
 
 import aiosqlite
+import orjson
 
 logger = logging.getLogger(__name__)
 
 # Schema Version fuer Migrationen
-SCHEMA_VERSION = 1
+SCHEMA_VERSION = 4
+
+# Anzahl gecachter Prepared Statements pro Verbindung
+STATEMENT_CACHE_SIZE = 256
+
+# Verbindungs-PRAGMAs: WAL + synchronous=NORMAL synct nur beim Checkpoint,
+# mmap/cache halten die (kleine) DB komplett im Speicher
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",   # 256 MB
+    "PRAGMA cache_size=-65536",     # 64 MB Page-Cache
+    "PRAGMA wal_autocheckpoint=1000",
+    "PRAGMA secure_delete=OFF",     # geloeschte Seiten nicht mit Nullen ueberschreiben
+)
+
+# Intervall fuer Wartung: PRAGMA optimize + WAL-Checkpoint (Sekunden)
+MAINTENANCE_INTERVAL = 900
+
+# Read-only Verbindungen fuer Dashboard-Abfragen (WAL: Leser blockieren nicht hinter Schreibern)
+READER_POOL_SIZE = 4
 
 SCHEMA_SQL = """
 -- Tasks von allen Agenten
@@ -72,7 +94,8 @@ CREATE TABLE IF NOT EXISTS calls (
     tasks_created TEXT DEFAULT '[]',
     transcript TEXT DEFAULT '[]',
     logs TEXT DEFAULT '',
-    summary TEXT
+    summary TEXT,
+    fts_rowid INTEGER
 );
 
 -- Agent-Konfigurationen
@@ -89,13 +112,16 @@ CREATE TABLE IF NOT EXISTS blacklist (
     blocked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Fehlgeschlagene Unlock-Anrufe (fuer Auto-Blacklist)
+-- Fehlgeschlagene Unlock-Anrufe (fuer Auto-Blacklist), failed_at als Unix-Epoch (UTC)
 CREATE TABLE IF NOT EXISTS failed_unlock_calls (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     caller_id TEXT NOT NULL,
-    failed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    failed_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
 );
 
+-- Covering-Index fuer das Zeitfenster-COUNT der Auto-Blacklist
+CREATE INDEX IF NOT EXISTS idx_fuc_caller_failed ON failed_unlock_calls(caller_id, failed_at);
+
 -- Whitelist (Nummern die Security-Code ueberspringen)
 CREATE TABLE IF NOT EXISTS whitelist (
     caller_id TEXT PRIMARY KEY,
@@ -111,80 +137,322 @@ CREATE TABLE IF NOT EXISTS schema_version (
 """
 
 
+# Indizes auf migrierte Spalten: erst nach _migrate_columns() anlegen
+INDEX_SQL = """
+-- Ein Index fuer alle calls-Abfragen nach Zeit: Anruf-Historie/call_logs (ORDER BY started_at
+-- ohne Sortierschritt), COUNT der Anrufe mit Caller-ID und Monatssumme der Kosten (beide covering).
+-- Ersetzt die frueheren, ueberlappenden idx_calls_started / idx_calls_started_cost.
+DROP INDEX IF EXISTS idx_calls_started;
+DROP INDEX IF EXISTS idx_calls_started_cost;
+CREATE INDEX IF NOT EXISTS idx_calls_started_cost_caller ON calls(started_at, cost_cents, caller_id);
+
+-- Schluessel des Volltext-Index (calls_fts liest den Inhalt per fts_rowid nach)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_calls_fts_rowid ON calls(fts_rowid);
+"""
+
+
+# Volltextsuche ueber Transcript/Logs (External-Content FTS5, per Trigger synchron gehalten).
+# calls hat einen TEXT-Primaerschluessel, seine implizite rowid kann sich bei VACUUM aendern;
+# der Index haengt deshalb an der eigenen Spalte fts_rowid (beim Insert vergeben, danach fest).
+FTS_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS calls_fts USING fts5(
+    transcript, logs, content='calls', content_rowid='fts_rowid', tokenize='unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS calls_ai AFTER INSERT ON calls BEGIN
+    UPDATE calls SET fts_rowid = (SELECT IFNULL(MAX(fts_rowid), 0) + 1 FROM calls)
+    WHERE rowid = new.rowid AND fts_rowid IS NULL;
+    INSERT INTO calls_fts(rowid, transcript, logs)
+    SELECT fts_rowid, transcript, logs FROM calls WHERE rowid = new.rowid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS calls_ad AFTER DELETE ON calls BEGIN
+    INSERT INTO calls_fts(calls_fts, rowid, transcript, logs)
+    VALUES ('delete', old.fts_rowid, old.transcript, old.logs);
+END;
+
+CREATE TRIGGER IF NOT EXISTS calls_au AFTER UPDATE OF transcript, logs ON calls BEGIN
+    INSERT INTO calls_fts(calls_fts, rowid, transcript, logs)
+    VALUES ('delete', old.fts_rowid, old.transcript, old.logs);
+    INSERT INTO calls_fts(rowid, transcript, logs) VALUES (new.fts_rowid, new.transcript, new.logs);
+END;
+"""
+
+# Alter Stand (Schema v3): Index auf der instabilen calls.rowid, wird neu aufgebaut
+FTS_DROP_SQL = """
+DROP TRIGGER IF EXISTS calls_ai;
+DROP TRIGGER IF EXISTS calls_ad;
+DROP TRIGGER IF EXISTS calls_au;
+DROP TABLE IF EXISTS calls_fts;
+"""
+
+
 class Database:
     """Async SQLite Datenbank-Manager."""
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, reader_pool_size: int = READER_POOL_SIZE):
         self.db_path = db_path
         self._db: Optional[aiosqlite.Connection] = None
+        self._reader_pool_size = reader_pool_size
+        self._readers: Optional[asyncio.Queue] = None
+        self._maint_task: Optional[asyncio.Task] = None
+        # False wenn SQLite ohne FTS5 kompiliert ist (Anruf-Suche deaktiviert)
+        self.fts_enabled = False
+        # Eine Schreib-Verbindung fuer alle Coroutinen: jeder Zugriff laeuft unter diesem Lock,
+        # damit kein fremdes Statement in eine offene Transaktion geraet (und mit ihr zurueckgerollt wird)
+        self._tx_lock = asyncio.Lock()
+        # Task der gerade transaction() haelt (seine Statements laufen ohne erneutes Locken)
+        self._tx_owner: Optional[asyncio.Task] = None
 
     async def initialize(self):
         """Datenbank initialisieren und Schema erstellen."""
         # Verzeichnis erstellen falls nicht vorhanden
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
 
-        self._db = await aiosqlite.connect(self.db_path)
+        # sqlite3 haelt pro Verbindung einen Cache kompilierter Statements (nach SQL-Text);
+        # explizit gross genug fuer alle festen Queries der Stores.
+        # isolation_level=None: Autocommit, Mehrfach-Writes laufen explizit ueber transaction()
+        self._db = await aiosqlite.connect(
+            self.db_path, cached_statements=STATEMENT_CACHE_SIZE, isolation_level=None
+        )
         self._db.row_factory = aiosqlite.Row
 
         # WAL-Modus fuer bessere Concurrent-Performance
         await self._db.execute("PRAGMA journal_mode=WAL")
         await self._db.execute("PRAGMA foreign_keys=ON")
+        for pragma in CONNECTION_PRAGMAS:
+            await self._db.execute(pragma)
 
         # Schema erstellen
         await self._db.executescript(SCHEMA_SQL)
 
         # Migrationen: fehlende Spalten hinzufuegen (ALTER TABLE IF NOT EXISTS gibt es nicht)
         await self._migrate_columns()
+        await self._migrate_data()
+        await self._db.executescript(INDEX_SQL)
+        await self._ensure_fts()
 
         # Schema-Version setzen
         await self._db.execute(
             "INSERT OR IGNORE INTO schema_version (version) VALUES (?)",
             (SCHEMA_VERSION,)
         )
-        await self._db.commit()
+
+        if self._readers is None:
+            await self._open_readers()
+
+        if self._maint_task is None:
+            self._maint_task = asyncio.create_task(self._maintenance())
 
         logger.info(f"Datenbank initialisiert: {self.db_path}")
 
+    async def _open_readers(self):
+        """Oeffnet den Pool read-only Verbindungen (erst nach Schema-Erstellung, mode=ro legt nichts an)."""
+        uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        self._readers = asyncio.Queue(maxsize=self._reader_pool_size)
+        for _ in range(self._reader_pool_size):
+            conn = await aiosqlite.connect(uri, uri=True, cached_statements=STATEMENT_CACHE_SIZE)
+            conn.row_factory = aiosqlite.Row
+            await conn.execute("PRAGMA query_only=ON")
+            self._readers.put_nowait(conn)
+
+    async def _maintenance(self):
+        """
+        Periodische Wartung: PRAGMA optimize haelt die Query-Planner-Statistiken aktuell,
+        wal_checkpoint(TRUNCATE) verhindert dass die WAL-Datei im Dauerbetrieb waechst.
+        """
+        while True:
+            await asyncio.sleep(MAINTENANCE_INTERVAL)
+            if not self._db:
+                continue
+            try:
+                async with self._conn() as db:
+                    await db.execute("PRAGMA optimize")
+                    await db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except Exception as e:
+                logger.warning(f"DB-Wartung fehlgeschlagen: {e}")
+
     async def _migrate_columns(self):
         """Fuegt fehlende Spalten zu bestehenden Tabellen hinzu."""
         migrations = [
             ("calls", "cost_cents", "REAL DEFAULT 0.0"),
             ("calls", "logs", "TEXT DEFAULT ''"),
+            ("calls", "fts_rowid", "INTEGER"),
         ]
+        # Vorhandene Spalten je Tabelle einmal per PRAGMA table_info lesen (Spalte 1 = Name)
+        existing: dict[str, set[str]] = {}
+        for table in {table for table, _, _ in migrations}:
+            async with self._db.execute(f"PRAGMA table_info({table})") as cursor:
+                existing[table] = {row[1] async for row in cursor}
+
         for table, column, col_type in migrations:
-            try:
-                await self._db.execute(f"SELECT {column} FROM {table} LIMIT 0")
-            except Exception:
+            if column not in existing[table]:
                 logger.info(f"Migration: {table}.{column} hinzufuegen")
                 await self._db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
-                await self._db.commit()
+
+    async def _ensure_fts(self):
+        """Legt den FTS5-Index fuer calls an und fuellt ihn einmalig aus dem Bestand."""
+        async with self._db.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'calls_fts'"
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is not None:
+            if "fts_rowid" in row[0]:
+                self.fts_enabled = True
+                return
+            logger.info("Migration: Volltext-Index calls_fts auf fts_rowid umstellen")
+            await self._db.executescript(FTS_DROP_SQL)
+        try:
+            await self._db.executescript(FTS_SQL)
+        except sqlite3.OperationalError as e:
+            # SQLite ohne FTS5 kompiliert: Suche bleibt deaktiviert, Rest laeuft normal
+            logger.warning(f"FTS5 nicht verfuegbar, Anruf-Suche deaktiviert: {e}")
+            return
+        await self._db.execute("INSERT INTO calls_fts(calls_fts) VALUES ('rebuild')")
+        self.fts_enabled = True
+        logger.info("Migration: Volltext-Index calls_fts aufgebaut")
+
+    async def _migrate_data(self):
+        """Konvertiert Bestandsdaten auf das aktuelle Format (idempotent)."""
+        # failed_unlock_calls.failed_at: ISO-Text (Schema v1) -> Unix-Epoch INTEGER
+        cursor = await self._db.execute(
+            "UPDATE failed_unlock_calls "
+            "SET failed_at = CAST(strftime('%s', failed_at) AS INTEGER) "
+            "WHERE typeof(failed_at) = 'text'"
+        )
+        if cursor.rowcount > 0:
+            logger.info(f"Migration: {cursor.rowcount} failed_unlock_calls auf Epoch-Zeitstempel umgestellt")
+
+        # calls.fts_rowid (Schema v4): Bestand eindeutig durchnummerieren (vor dem UNIQUE-Index)
+        cursor = await self._db.execute(
+            "UPDATE calls SET fts_rowid = rowid + "
+            "(SELECT IFNULL(MAX(fts_rowid), 0) FROM calls) "
+            "WHERE fts_rowid IS NULL"
+        )
+        if cursor.rowcount > 0:
+            logger.info(f"Migration: {cursor.rowcount} calls mit fts_rowid versehen")
 
     async def close(self):
         """Datenbank-Verbindung schliessen."""
+        if self._maint_task:
+            self._maint_task.cancel()
+            self._maint_task = None
+        if self._readers is not None:
+            while not self._readers.empty():
+                await self._readers.get_nowait().close()
+            self._readers = None
         if self._db:
             await self._db.close()
             self._db = None
 
+    @asynccontextmanager
+    async def _conn(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Schreib-Verbindung exklusiv nutzen (wartet auf eine offene Transaktion anderer Tasks)."""
+        if self._tx_owner is not None and self._tx_owner is asyncio.current_task():
+            yield self._db
+            return
+        async with self._tx_lock:
+            yield self._db
+
     async def execute(self, sql: str, params: tuple = ()) -> aiosqlite.Cursor:
-        """SQL ausfuehren."""
-        cursor = await self._db.execute(sql, params)
-        await self._db.commit()
-        return cursor
+        """SQL ausfuehren (Autocommit, innerhalb von transaction() Teil der Transaktion)."""
+        async with self._conn() as db:
+            return await db.execute(sql, params)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Mehrere Schreibzugriffe mit einem Commit (ein WAL-Sync statt einem pro Statement).
+
+        BEGIN IMMEDIATE holt den Writer-Lock sofort statt erst beim ersten Write
+        (kein SQLITE_BUSY mitten in der Transaktion).
+
+        Beispiel:
+            async with db.transaction():
+                await db.execute(sql_a, params_a)
+                await db.execute(sql_b, params_b)
+        """
+        async with self._tx_lock:
+            self._tx_owner = asyncio.current_task()
+            try:
+                await self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    yield self
+                    await self._db.execute("COMMIT")
+                except BaseException:
+                    await self._db.execute("ROLLBACK")
+                    raise
+            finally:
+                self._tx_owner = None
 
     async def fetch_one(self, sql: str, params: tuple = ()) -> Optional[dict]:
         """Eine Zeile abfragen."""
-        cursor = await self._db.execute(sql, params)
-        row = await cursor.fetchone()
+        async with self._conn() as db:
+            cursor = await db.execute(sql, params)
+            row = await cursor.fetchone()
         if row:
             return dict(row)
         return None
 
     async def fetch_all(self, sql: str, params: tuple = ()) -> list[dict]:
         """Alle Zeilen abfragen."""
-        cursor = await self._db.execute(sql, params)
-        rows = await cursor.fetchall()
+        async with self._conn() as db:
+            cursor = await db.execute(sql, params)
+            rows = await cursor.fetchall()
         return [dict(row) for row in rows]
 
+    async def fetch_one_raw(self, sql: str, params: tuple = ()) -> Optional[aiosqlite.Row]:
+        """Eine Zeile als aiosqlite.Row (ohne dict-Kopie; nur row["spalte"], kein .get())."""
+        async with self._conn() as db:
+            cursor = await db.execute(sql, params)
+            return await cursor.fetchone()
+
+    async def iter_rows_raw(self, sql: str, params: tuple = ()) -> AsyncIterator[aiosqlite.Row]:
+        """
+        Zeilen einzeln als aiosqlite.Row liefern statt alles auf einmal zu materialisieren.
+
+        Haelt die Schreib-Verbindung bis zum Ende der Iteration: im Schleifenrumpf nicht schreiben.
+        """
+        async with self._conn() as db, db.execute(sql, params) as cursor:
+            async for row in cursor:
+                yield row
+
+    async def fetch_one_ro(self, sql: str, params: tuple = ()) -> Optional[dict]:
+        """Eine Zeile ueber eine read-only Verbindung aus dem Pool abfragen."""
+        if self._readers is None:
+            return await self.fetch_one(sql, params)
+        conn = await self._readers.get()
+        try:
+            cursor = await conn.execute(sql, params)
+            row = await cursor.fetchone()
+        finally:
+            self._readers.put_nowait(conn)
+        if row:
+            return dict(row)
+        return None
+
+    async def fetch_all_ro(self, sql: str, params: tuple = ()) -> list[dict]:
+        """Alle Zeilen ueber eine read-only Verbindung aus dem Pool abfragen."""
+        if self._readers is None:
+            return await self.fetch_all(sql, params)
+        conn = await self._readers.get()
+        try:
+            cursor = await conn.execute(sql, params)
+            rows = await cursor.fetchall()
+        finally:
+            self._readers.put_nowait(conn)
+        return [dict(row) for row in rows]
+
+
+def json_dumps(obj: Any) -> str:
+    """JSON-Spalte serialisieren (orjson; als str, damit SQLite TEXT statt BLOB speichert)."""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def json_loads(data: Optional[str | bytes]) -> Any:
+    """JSON-Spalte deserialisieren (orjson)."""
+    return orjson.loads(data)
+
 
 # Globale Datenbank-Instanz
 _db: Optional[Database] = None
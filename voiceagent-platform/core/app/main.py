@@ -5,25 +5,26 @@ Verbindet alle Komponenten: SIP, AI, Agents, Tasks, WebSocket.
 """
 
 import asyncio
-import json
 import logging
-import math
 import os
-import struct
 import uuid
 from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
+from functools import lru_cache, partial
+from typing import Optional
 
+import numpy as np
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 
 from core.app.config import settings
-from core.app.db.database import get_database
+from core.app.db.database import Database, get_database, json_dumps
 from core.app.sip.sip_client import SIPClient
-from core.app.sip.audio import sip_to_ai_input, ai_output_to_sip
-from core.app.ai.voice_client import VoiceClient, MODEL_MINI, MODEL_PREMIUM, MODEL_MAP
+from core.app.sip.audio import sip_to_ai_input, ai_output_to_sip, reset_resamplers
+from core.app.ai.voice_client import VoiceClient, Usage, MODEL_MINI, MODEL_PREMIUM, MODEL_MAP
 from core.app.ai.agent_router import AgentRouter
 from core.app.agents.registry import AgentRegistry
 from core.app.agents.manager import AgentManager
@@ -31,7 +32,9 @@ from core.app.tasks.store import TaskStore
 from core.app.tasks.executor import TaskExecutor
 from core.app.ws.manager import ConnectionManager
 from core.app.blacklist.store import BlacklistStore
-from core.app.api.routes import setup_routes, is_ip_allowed
+from agents.ideas_agent.idea_store import IdeaStore
+from agents.ideas_agent.project_planner import ProjectPlanner
+from core.app.api.routes import APIKeyMiddleware, setup_routes, is_ip_allowed
 from core.app.api.ws_routes import setup_ws_routes
 
 # Logging Setup
@@ -41,25 +44,68 @@ logging.basicConfig(
     datefmt='%H:%M:%S'
 )
 logger = logging.getLogger(__name__)
+# Vorab gebunden fuer den Audio-Pfad (spart den Attribut-Lookup pro Paket)
+_log_info = logger.info
 
 # ============== App State ==============
 # Alle Komponenten werden hier gehalten und an Routes weitergegeben
 
-app_state = {}
-
-
-# ============== Audio Stats ==============
-
-_audio_stats = {
-    "caller_to_ai": 0,
-    "ai_to_caller": 0,
-    "caller_bytes": 0,
-    "ai_bytes": 0,
-}
-
-# ============== Call Transcript Accumulator ==============
-_call_transcript = []
-_call_started_at = None
+@dataclass(slots=True)
+class CallState:
+    """Zustand des laufenden Anrufs (Modell, Kosten, Transcript, Audio-Statistik); pro Anruf neu."""
+    cost_usd: float = 0.0
+    current_model_key: str = "mini"
+    user_chosen_model: str = "mini"
+    last_usage: Usage = field(default_factory=Usage)
+    transcript: list = field(default_factory=list)
+    started_at: Optional[datetime] = None
+    log_handler: Optional[logging.Handler] = None
+    # Timer-Tasks des Anrufs (Begruessung, Security-Gate-Timeout)
+    greeting_task: Optional[asyncio.Task] = None
+    security_timeout_task: Optional[asyncio.Task] = None
+    # Audio-Statistik
+    caller_to_ai: int = 0
+    ai_to_caller: int = 0
+    caller_bytes: int = 0
+    ai_bytes: int = 0
+    # Sammelpuffer fuer Caller-Audio (nur bei RESAMPLE_BATCH_FRAMES > 1)
+    caller_buf: bytearray = field(default_factory=bytearray)
+    # Teil-Transkript (Deltas) bis zum naechsten gebuendelten Broadcast
+    partial_role: str = ""
+    partial_text: list = field(default_factory=list)
+    partial_handle: Optional[asyncio.TimerHandle] = None
+
+
+@dataclass(slots=True)
+class AppState:
+    """Zentrale Komponenten der Plattform (im Lifespan gesetzt, Attribut-Zugriff statt Dict-Lookup)."""
+    db: Optional[Database] = None
+    task_store: Optional[TaskStore] = None
+    task_executor: Optional[TaskExecutor] = None
+    blacklist_store: Optional[BlacklistStore] = None
+    idea_store: Optional[IdeaStore] = None
+    project_planner: Optional[ProjectPlanner] = None
+    agent_registry: Optional[AgentRegistry] = None
+    agent_manager: Optional[AgentManager] = None
+    agent_router: Optional[AgentRouter] = None
+    sip_client: Optional[SIPClient] = None
+    voice_client: Optional[VoiceClient] = None
+    ws_manager: Optional[ConnectionManager] = None
+    current_call_id: Optional[str] = None
+    call_state: CallState = field(default_factory=CallState)
+
+
+app_state = AppState()
+
+
+# Audio-Statistik nur jedes n-te Paket loggen (20ms-Pakete -> ca. 1x pro Sekunde)
+AUDIO_LOG_EVERY = 50
+
+# Teil-Transkripte hoechstens alle 50ms gebuendelt an die GUI senden
+TRANSCRIPT_PARTIAL_DELAY = 0.05
+
+# Groesse eines 20ms-Frames vom SIP-Port (PCM16 mono)
+SIP_FRAME_BYTES = settings.SAMPLE_RATE_SIP // 50 * 2
 
 
 # ============== Per-Call Log Capture ==============
@@ -85,9 +131,6 @@ class CallLogHandler(logging.Handler):
         return '\n'.join(self.records)
 
 
-_call_log_handler: CallLogHandler = None
-
-
 # ============== OpenAI Realtime Pricing ($/1M tokens) ==============
 
 _PRICING = {
@@ -101,46 +144,39 @@ _PRICING = {
     },
 }
 
-# ============== Call-Level Model/Cost State ==============
-
-_call_cost_usd = 0.0
-_current_model_key = "mini"
-_user_chosen_model = "mini"
-_last_usage = {
-    "input_text_tokens": 0,
-    "input_audio_tokens": 0,
-    "output_text_tokens": 0,
-    "output_audio_tokens": 0,
+# Vorberechnet: $/Token je Modell als Tupel (input_text, input_audio, output_text, output_audio)
+_PRICE_PER_TOKEN = {
+    model: tuple(p[k] / 1_000_000 for k in ("input_text", "input_audio", "output_text", "output_audio"))
+    for model, p in _PRICING.items()
 }
 
+# ============== Call-Level Model/Cost State ==============
 
-def _set_model_state(model_key: str, user_chosen: bool = False):
+def _set_model_state(state: CallState, model_key: str, user_chosen: bool = False):
     """Setzt den aktuellen Model-State."""
-    global _current_model_key, _user_chosen_model
-    _current_model_key = model_key
+    state.current_model_key = model_key
     if user_chosen:
-        _user_chosen_model = model_key
+        state.user_chosen_model = model_key
 
 
-def _calculate_delta_cost(usage: dict) -> float:
-    """Berechnet Kosten-Delta seit letztem Update basierend auf aktuellem Modell."""
-    global _last_usage, _call_cost_usd
-    pricing = _PRICING.get(_current_model_key, _PRICING["mini"])
+def _calculate_delta_cost(state: CallState, usage: Usage) -> tuple[float, float]:
+    """Berechnet Kosten-Delta seit letztem Update basierend auf aktuellem Modell (Gesamt, Delta)."""
+    in_text, in_audio, out_text, out_audio = _PRICE_PER_TOKEN.get(
+        state.current_model_key, _PRICE_PER_TOKEN["mini"]
+    )
+    last = state.last_usage
 
-    delta_cost = 0.0
-    for token_key, price_key in [
-        ("input_text_tokens", "input_text"),
-        ("input_audio_tokens", "input_audio"),
-        ("output_text_tokens", "output_text"),
-        ("output_audio_tokens", "output_audio"),
-    ]:
-        delta_tokens = usage.get(token_key, 0) - _last_usage.get(token_key, 0)
-        if delta_tokens > 0:
-            delta_cost += delta_tokens * pricing[price_key] / 1_000_000
+    delta_cost = (
+        max(usage.input_text_tokens - last.input_text_tokens, 0) * in_text
+        + max(usage.input_audio_tokens - last.input_audio_tokens, 0) * in_audio
+        + max(usage.output_text_tokens - last.output_text_tokens, 0) * out_text
+        + max(usage.output_audio_tokens - last.output_audio_tokens, 0) * out_audio
+    )
 
-    _last_usage = dict(usage)
-    _call_cost_usd += delta_cost
-    return _call_cost_usd
+    # Usage ist unveraenderlich - Referenz genuegt, keine Kopie
+    state.last_usage = usage
+    state.cost_usd += delta_cost
+    return state.cost_usd, delta_cost
 
 
 # ============== Beep-Ton fuer Security Gate ==============
@@ -148,40 +184,61 @@ def _calculate_delta_cost(usage: dict) -> float:
 def _generate_beep(freq=800, duration_ms=150, sample_rate=48000, volume=0.3):
     """Erzeugt einen kurzen Beep-Ton als PCM16 bei 48kHz fuer SIP."""
     num_samples = int(sample_rate * duration_ms / 1000)
-    data = bytearray(num_samples * 2)
     fade_samples = int(sample_rate * 0.01)  # 10ms fade in/out
-    for i in range(num_samples):
-        envelope = 1.0
-        if i < fade_samples:
-            envelope = i / fade_samples
-        elif i > num_samples - fade_samples:
-            envelope = (num_samples - i) / fade_samples
-        value = int(volume * envelope * 32767 * math.sin(2 * math.pi * freq * i / sample_rate))
-        struct.pack_into('<h', data, i * 2, max(-32768, min(32767, value)))
-    return bytes(data)
+    i = np.arange(num_samples, dtype=np.float64)
+    # Lineares Fade-in/-out, dazwischen 1.0
+    envelope = np.minimum(np.minimum(i, num_samples - i) / fade_samples, 1.0)
+    wave = np.trunc(volume * envelope * 32767 * np.sin(2 * np.pi * freq * i / sample_rate))
+    return wave.clip(-32768, 32767).astype("<i2").tobytes()
+
+def _split_sip_frames(pcm: bytes) -> tuple[bytes, ...]:
+    """Zerlegt PCM16 in 20ms-SIP-Frames; der letzte Frame wird mit Stille aufgefuellt."""
+    pcm += bytes(-len(pcm) % SIP_FRAME_BYTES)
+    return tuple(pcm[i:i + SIP_FRAME_BYTES] for i in range(0, len(pcm), SIP_FRAME_BYTES))
+
+
+@lru_cache(maxsize=1)
+def _beep_frames() -> tuple[bytes, ...]:
+    """Beep beim ersten Gebrauch erzeugen und in SIP-Frames zerlegt cachen (nicht beim Import)."""
+    return _split_sip_frames(_generate_beep())
+
+
+# ============== Begruessung ==============
+
+GREETING_DELAY_SECONDS = 0.2
+
 
-_BEEP_SOUND = _generate_beep()
+async def _delayed_greeting(voice_client: VoiceClient):
+    """Begruessung nach kurzer Verzoegerung ausloesen."""
+    await asyncio.sleep(GREETING_DELAY_SECONDS)
+    await voice_client.trigger_greeting()
+
+
+def _cancel_greeting():
+    """Bricht eine noch ausstehende Begruessung ab (z.B. Auflegen innerhalb der Verzoegerung)."""
+    state = app_state.call_state
+    if state.greeting_task and not state.greeting_task.done():
+        state.greeting_task.cancel()
+    state.greeting_task = None
 
 
 # ============== Security Gate Timeout ==============
 
 SECURITY_TIMEOUT_SECONDS = 15
-_security_timeout_task = None
 
 
 async def _start_security_timeout():
     """Startet den 15s Inaktivitaets-Timeout fuer Security Gate."""
-    global _security_timeout_task
     _cancel_security_timeout()
-    _security_timeout_task = asyncio.create_task(_security_timeout_handler())
+    app_state.call_state.security_timeout_task = asyncio.create_task(_security_timeout_handler())
 
 
 def _cancel_security_timeout():
     """Stoppt den Security-Timeout."""
-    global _security_timeout_task
-    if _security_timeout_task and not _security_timeout_task.done():
-        _security_timeout_task.cancel()
-    _security_timeout_task = None
+    state = app_state.call_state
+    if state.security_timeout_task and not state.security_timeout_task.done():
+        state.security_timeout_task.cancel()
+    state.security_timeout_task = None
 
 
 async def _security_timeout_handler():
@@ -191,8 +248,8 @@ async def _security_timeout_handler():
     except asyncio.CancelledError:
         return
 
-    sip_client = app_state.get("sip_client")
-    agent_manager = app_state.get("agent_manager")
+    sip_client = app_state.sip_client
+    agent_manager = app_state.agent_manager
 
     if not (sip_client and sip_client.is_in_call):
         return
@@ -201,85 +258,97 @@ async def _security_timeout_handler():
 
     logger.warning(f"Security Timeout - {SECURITY_TIMEOUT_SECONDS}s keine Eingabe, Anruf wird beendet")
 
-    # Fehlgeschlagenen Anruf aufzeichnen und Auto-Blacklist pruefen
-    blacklist_store = app_state.get("blacklist_store")
-    ws_manager = app_state.get("ws_manager")
-    caller_id = agent_manager._current_caller
+    # Fehlgeschlagenen Anruf im Hintergrund speichern, Auflegen wartet nicht auf die DB
+    _schedule_failed_call(agent_manager._current_caller)
+
+    await sip_client.hangup()
 
-    if blacklist_store and caller_id:
+
+# ============== Fehlgeschlagene Anrufe (Security Gate) ==============
+
+# Referenzen halten, damit laufende Hintergrund-Tasks nicht vom GC eingesammelt werden
+_background_tasks: set[asyncio.Task] = set()
+
+
+async def _persist_failed_call(caller_id: str):
+    """Fehlgeschlagenen Anruf aufzeichnen und Auto-Blacklist pruefen."""
+    blacklist_store: BlacklistStore = app_state.blacklist_store
+    try:
         await blacklist_store.record_failed_call(caller_id)
-        blacklisted = await blacklist_store.check_and_auto_blacklist(caller_id)
-        if blacklisted and ws_manager:
-            await ws_manager.broadcast({"type": "blacklist_updated"})
+        if await blacklist_store.check_and_auto_blacklist(caller_id):
+            app_state.ws_manager.broadcast_nowait({"type": "blacklist_updated"})
+    except Exception as e:
+        logger.error(f"Fehlgeschlagener Anruf konnte nicht gespeichert werden ({caller_id}): {e}")
 
-    await sip_client.hangup()
+
+def _schedule_failed_call(caller_id: Optional[str]):
+    """Startet _persist_failed_call als Hintergrund-Task (abseits des Hangup-Pfads)."""
+    if not (app_state.blacklist_store and caller_id):
+        return
+    task = asyncio.create_task(_persist_failed_call(caller_id))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
 
 
 # ============== Event Handlers ==============
 
+async def on_call_rejected(caller_id: str, remote_ip: str, reason: str):
+    """Anruf wurde bereits vom SIP-Client abgelehnt (IP-Firewall)."""
+    ws_manager: ConnectionManager = app_state.ws_manager
+    ws_manager.broadcast_nowait({
+        "type": "call_rejected",
+        "caller_id": caller_id,
+        "remote_ip": remote_ip,
+        "reason": reason,
+    })
+
+
 async def on_incoming_call(caller_id: str, remote_ip: str = None):
     """Eingehender Anruf."""
-    sip_client: SIPClient = app_state["sip_client"]
-    voice_client: VoiceClient = app_state["voice_client"]
-    agent_manager: AgentManager = app_state["agent_manager"]
-    ws_manager: ConnectionManager = app_state["ws_manager"]
-    agent_router: AgentRouter = app_state["agent_router"]
-
-    logger.info(f"Eingehender Anruf von: {caller_id} (IP: {remote_ip})")
-
-    # Blacklist pruefen (vor IP-Check, da Blacklist spezifischer ist)
-    blacklist_store: BlacklistStore = app_state.get("blacklist_store")
-    if blacklist_store and await blacklist_store.is_blacklisted(caller_id):
-        logger.warning(f"ABGELEHNT: Anruf von geblockter Nummer {caller_id}")
-        await sip_client.reject_call(403)
-        await ws_manager.broadcast({
-            "type": "call_rejected",
-            "caller_id": caller_id,
-            "remote_ip": remote_ip,
-            "reason": "Nummer auf Blacklist",
-        })
-        return
+    sip_client: SIPClient = app_state.sip_client
+    voice_client: VoiceClient = app_state.voice_client
+    agent_manager: AgentManager = app_state.agent_manager
+    ws_manager: ConnectionManager = app_state.ws_manager
+    agent_router: AgentRouter = app_state.agent_router
+
+    logger.info("Eingehender Anruf von: %s (IP: %s)", caller_id, remote_ip)
+
+    # IP-Whitelist wurde bereits im SIP-Client geprueft (sip_client.call_filter)
 
-    # IP-Whitelist pruefen
-    if not is_ip_allowed(remote_ip, caller_id):
-        logger.warning(f"ABGELEHNT: Anruf von nicht autorisierter IP {remote_ip}")
+    # Whitelist/Blacklist pruefen (Whitelist hat Vorrang)
+    blacklist_store: BlacklistStore = app_state.blacklist_store
+    admission = blacklist_store.admit(caller_id) if blacklist_store else "screen"
+    if admission == "block":
+        logger.warning("ABGELEHNT: Anruf von geblockter Nummer %s", caller_id)
         await sip_client.reject_call(403)
-        await ws_manager.broadcast({
+        ws_manager.broadcast_nowait({
             "type": "call_rejected",
             "caller_id": caller_id,
             "remote_ip": remote_ip,
-            "reason": "IP nicht auf Whitelist",
+            "reason": "Nummer auf Blacklist",
         })
         return
 
-    # Whitelist pruefen: Nummer ueberspringt Security-Code
-    is_whitelisted = blacklist_store and await blacklist_store.is_whitelisted(caller_id)
+    # Whitelist: Nummer ueberspringt Security-Code
+    is_whitelisted = admission == "allow"
     if is_whitelisted:
-        logger.info(f"WHITELIST: Anruf von {caller_id} - Security-Code wird uebersprungen")
-
-    # Reset
-    global _call_cost_usd, _last_usage, _call_transcript, _call_started_at, _call_log_handler
-    _audio_stats["caller_to_ai"] = 0
-    _audio_stats["ai_to_caller"] = 0
-    _audio_stats["caller_bytes"] = 0
-    _audio_stats["ai_bytes"] = 0
-    _call_cost_usd = 0.0
-    _call_transcript = []
-    _call_started_at = datetime.utcnow()
+        logger.info("WHITELIST: Anruf von %s - Security-Code wird uebersprungen", caller_id)
+
+    # Reset: frischer Call-State (Default-Modell "mini", vom Nutzer gewaehlt);
+    # Timer des vorherigen Anrufs duerfen nicht in den neuen hineinlaufen
+    _cancel_greeting()
+    _cancel_security_timeout()
+    old_handler = app_state.call_state.log_handler
+    if old_handler:
+        logging.getLogger().removeHandler(old_handler)
     # Per-Call Log Capture starten
-    if _call_log_handler:
-        logging.getLogger().removeHandler(_call_log_handler)
-    _call_log_handler = CallLogHandler()
-    logging.getLogger().addHandler(_call_log_handler)
-    _set_model_state("mini", user_chosen=True)
-    _last_usage = {
-        "input_text_tokens": 0, "input_audio_tokens": 0,
-        "output_text_tokens": 0, "output_audio_tokens": 0,
-    }
+    state = CallState(started_at=datetime.utcnow(), log_handler=CallLogHandler())
+    logging.getLogger().addHandler(state.log_handler)
+    app_state.call_state = state
     voice_client._model = MODEL_MINI  # Default: guenstiges Modell
     agent_router.clear_history()
 
-    await ws_manager.broadcast({
+    ws_manager.broadcast_nowait({
         "type": "call_incoming",
         "caller_id": caller_id,
     })
@@ -310,23 +379,19 @@ async def on_incoming_call(caller_id: str, remote_ip: str = None):
         await _start_security_timeout()
     else:
         # Begruessung nach kurzer Verzoegerung (nur fuer nicht-Security Agents)
-        async def delayed_greeting():
-            await asyncio.sleep(0.2)
-            await voice_client.trigger_greeting()
-
-        asyncio.create_task(delayed_greeting())
+        app_state.call_state.greeting_task = asyncio.create_task(_delayed_greeting(voice_client))
 
     # Anruf in DB aufzeichnen
-    db = app_state.get("db")
+    db = app_state.db
     if db:
         _current_call_id = str(uuid.uuid4())
-        app_state["_current_call_id"] = _current_call_id
+        app_state.current_call_id = _current_call_id
         await db.execute(
             "INSERT INTO calls (id, caller_id, started_at) VALUES (?, ?, ?)",
             (_current_call_id, caller_id, datetime.utcnow().isoformat())
         )
 
-    await ws_manager.broadcast({
+    ws_manager.broadcast_nowait({
         "type": "call_active",
         "caller_id": caller_id,
         "agent": agent_manager.active_agent_name,
@@ -335,82 +400,136 @@ async def on_incoming_call(caller_id: str, remote_ip: str = None):
 
 async def on_audio_from_caller(audio_data: bytes):
     """Audio vom Anrufer empfangen (48kHz) -> AI (16kHz)."""
-    voice_client: VoiceClient = app_state["voice_client"]
+    voice_client: VoiceClient = app_state.voice_client
+    # Verworfene Pakete (AI nicht verbunden) kosten nichts
+    if not voice_client or not voice_client.is_connected:
+        return
 
-    _audio_stats["caller_to_ai"] += 1
-    _audio_stats["caller_bytes"] += len(audio_data)
+    state = app_state.call_state
+    state.caller_to_ai += 1
+    state.caller_bytes += len(audio_data)
 
-    if _audio_stats["caller_to_ai"] % 50 == 1:
-        logger.info(
-            f"[AUDIO] Caller->AI: {_audio_stats['caller_to_ai']} Pakete, "
-            f"{_audio_stats['caller_bytes']} Bytes"
-        )
+    if state.caller_to_ai % AUDIO_LOG_EVERY == 1 and logger.isEnabledFor(logging.INFO):
+        _log_info("[AUDIO] Caller->AI: %d Pakete, %d Bytes", state.caller_to_ai, state.caller_bytes)
 
-    if voice_client and voice_client.is_connected:
-        try:
-            resampled = sip_to_ai_input(audio_data)
-            await voice_client.send_audio(resampled)
-        except Exception as e:
-            logger.warning(f"Audio Resample Fehler (Caller->AI): {e}")
+    # Mehrere Frames sammeln und als ein Block resamplen/senden
+    batch = settings.RESAMPLE_BATCH_FRAMES
+    if batch > 1:
+        buf = state.caller_buf
+        buf += audio_data
+        if len(buf) < batch * SIP_FRAME_BYTES:
+            return
+        audio_data = bytes(buf)
+        buf.clear()
+
+    try:
+        resampled = sip_to_ai_input(audio_data)
+        await voice_client.send_audio(resampled)
+    except Exception as e:
+        logger.warning("Audio Resample Fehler (Caller->AI): %s", e)
 
 
 async def on_audio_from_ai(audio_data: bytes):
     """Audio von AI empfangen (24kHz) -> Anrufer (48kHz)."""
-    sip_client: SIPClient = app_state["sip_client"]
+    sip_client: SIPClient = app_state.sip_client
+    if not sip_client or not sip_client.is_in_call:
+        return
+
+    state = app_state.call_state
+    state.ai_to_caller += 1
+    state.ai_bytes += len(audio_data)
 
-    _audio_stats["ai_to_caller"] += 1
-    _audio_stats["ai_bytes"] += len(audio_data)
+    if state.ai_to_caller % AUDIO_LOG_EVERY == 1 and logger.isEnabledFor(logging.INFO):
+        _log_info("[AUDIO] AI->Caller: %d Pakete, %d Bytes", state.ai_to_caller, state.ai_bytes)
 
-    if _audio_stats["ai_to_caller"] % 50 == 1:
-        logger.info(
-            f"[AUDIO] AI->Caller: {_audio_stats['ai_to_caller']} Pakete, "
-            f"{_audio_stats['ai_bytes']} Bytes"
+    try:
+        resampled = ai_output_to_sip(audio_data)
+        await sip_client.send_audio(resampled)
+    except Exception as e:
+        logger.warning("Audio Resample Fehler (AI->Caller): %s", e)
+
+
+def _flush_partial_transcript(state: CallState):
+    """Gesammelte Teil-Transkript-Deltas als eine Nachricht senden."""
+    state.partial_handle = None
+    if not state.partial_text:
+        return
+    text = "".join(state.partial_text)
+    state.partial_text.clear()
+    app_state.ws_manager.broadcast_nowait({
+        "type": "transcript",
+        "role": state.partial_role,
+        "text": text,
+        "is_final": False,
+    })
+
+
+def _queue_partial_transcript(role: str, text: str):
+    """Teil-Transkript puffern; ein Timer sendet alle Deltas des Fensters zusammen."""
+    state = app_state.call_state
+    if state.partial_text and state.partial_role != role:
+        _flush_partial_transcript(state)
+    state.partial_role = role
+    state.partial_text.append(text)
+    if state.partial_handle is None:
+        state.partial_handle = asyncio.get_running_loop().call_later(
+            TRANSCRIPT_PARTIAL_DELAY, _flush_partial_transcript, state
         )
 
-    if sip_client and sip_client.is_in_call:
-        try:
-            resampled = ai_output_to_sip(audio_data)
-            await sip_client.send_audio(resampled)
-        except Exception as e:
-            logger.warning(f"Audio Resample Fehler (AI->Caller): {e}")
+
+def _drop_partial_transcript(role: str):
+    """Ausstehende Teil-Transkripte einer Rolle verwerfen (das finale Transkript enthaelt den ganzen Text)."""
+    state = app_state.call_state
+    if state.partial_role != role:
+        return
+    if state.partial_handle is not None:
+        state.partial_handle.cancel()
+        state.partial_handle = None
+    state.partial_text.clear()
 
 
 async def on_transcript(role: str, text: str, is_final: bool):
     """Transkript-Update von AI."""
-    ws_manager: ConnectionManager = app_state["ws_manager"]
-    agent_router: AgentRouter = app_state["agent_router"]
+    ws_manager: ConnectionManager = app_state.ws_manager
+    agent_router: AgentRouter = app_state.agent_router
+
+    # Teil-Transkripte (Deltas) buendeln statt jedes einzeln zu senden
+    if not is_final:
+        _queue_partial_transcript(role, text)
+        return
+    _drop_partial_transcript(role)
 
     # Security Gate: Timeout bei Anrufer-Sprache zuruecksetzen
     if role in ("caller", "user") and is_final and text:
-        agent_manager: AgentManager = app_state["agent_manager"]
+        agent_manager: AgentManager = app_state.agent_manager
         if agent_manager and agent_manager.active_agent_name == "security_agent":
             await _start_security_timeout()  # Reset: neuer 15s Timer
 
     # Bot Stop/Start: AI pausieren/fortsetzen (nicht im Security Agent)
     if role in ("caller", "user") and is_final and text:
-        voice_client: VoiceClient = app_state["voice_client"]
-        agent_manager: AgentManager = app_state["agent_manager"]
+        voice_client: VoiceClient = app_state.voice_client
+        agent_manager: AgentManager = app_state.agent_manager
         text_lower = text.strip().lower()
 
         if agent_manager and agent_manager.active_agent_name != "security_agent":
             if ("bot stop" in text_lower or "bot stopp" in text_lower) and not voice_client.bot_paused:
-                logger.info(f"[BotPause] 'Bot stop' erkannt - pausiere Bot")
+                logger.info("[BotPause] 'Bot stop' erkannt - pausiere Bot")
                 await voice_client.pause_bot()
-                await ws_manager.broadcast({"type": "bot_paused", "paused": True})
+                ws_manager.broadcast_nowait({"type": "bot_paused", "paused": True})
                 return  # Transcript nicht weiterverarbeiten
             elif "bot start" in text_lower and voice_client.bot_paused:
-                logger.info(f"[BotPause] 'Bot start' erkannt - Bot wieder aktiv")
+                logger.info("[BotPause] 'Bot start' erkannt - Bot wieder aktiv")
                 await voice_client.unpause_bot()
-                await ws_manager.broadcast({"type": "bot_paused", "paused": False})
+                ws_manager.broadcast_nowait({"type": "bot_paused", "paused": False})
                 return  # Transcript nicht weiterverarbeiten
 
     # Transkript an Router fuer Intent-Erkennung
     if is_final and text:
         agent_router.add_transcript(role, text)
         # Transcript fuer Call-History speichern
-        _call_transcript.append({"role": role, "text": text})
+        app_state.call_state.transcript.append({"role": role, "text": text})
 
-    await ws_manager.broadcast({
+    ws_manager.broadcast_nowait({
         "type": "transcript",
         "role": role,
         "text": text,
@@ -418,202 +537,210 @@ async def on_transcript(role: str, text: str, is_final: bool):
     })
 
 
-async def on_function_call(call_id: str, name: str, arguments: dict) -> str:
-    """Function Call von AI -> Agent-Manager fuehrt Tool aus."""
-    agent_manager: AgentManager = app_state["agent_manager"]
-    voice_client: VoiceClient = app_state["voice_client"]
-    ws_manager: ConnectionManager = app_state["ws_manager"]
-
-    # An GUI senden
-    await ws_manager.broadcast({
-        "type": "function_call",
+def _broadcast_function_result(name: str, result: str):
+    """Tool-Ergebnis an die GUI senden."""
+    app_state.ws_manager.broadcast_nowait({
+        "type": "function_result",
         "name": name,
-        "arguments": arguments,
+        "result": result,
     })
 
-    # Agent fuehrt Tool aus
-    result = await agent_manager.execute_tool(name, arguments)
 
-    # Pruefen ob das Ergebnis ein Beep-Signal ist (Security Gate: falscher Code)
-    if result and result == "__BEEP__":
-        sip_client: SIPClient = app_state["sip_client"]
+# ============== Tool-Ergebnis-Signale ==============
+# Agents signalisieren Aktionen ueber Sentinel-Strings im Tool-Ergebnis.
+# Jeder Handler bekommt (name, arg) - arg ist der Teil nach dem Praefix ("" bei exakten
+# Signalen) - und liefert das Ergebnis fuer die AI zurueck.
 
-        logger.info("[SecurityGate] Falscher Code - Beep")
+async def _handle_beep(name: str, arg: str) -> str:
+    """__BEEP__: Security Gate, falscher Code."""
+    sip_client: SIPClient = app_state.sip_client
 
-        # Beep-Ton direkt an SIP senden
-        if sip_client and sip_client.is_in_call:
-            await sip_client.send_audio(_BEEP_SOUND)
+    logger.info("[SecurityGate] Falscher Code - Beep")
 
-        # Security Timeout zuruecksetzen
-        await _start_security_timeout()
+    # Beep-Ton direkt an SIP senden
+    if sip_client and sip_client.is_in_call:
+        await sip_client.send_audio_frames(_beep_frames())
 
-        await ws_manager.broadcast({
-            "type": "function_result",
-            "name": name,
-            "result": "Falscher Code (Beep)",
-        })
+    # Security Timeout zuruecksetzen
+    await _start_security_timeout()
 
-        # __BEEP_QUIET__: Result senden aber KEINE neue Response triggern
-        # AI wartet passiv auf naechsten Audio-Input vom Anrufer
-        return "__BEEP_QUIET__:Warte auf Code."
-
-    # Pruefen ob das Ergebnis ein Hangup-Signal ist (Security Gate: zu viele Fehlversuche)
-    if result and result.startswith("__HANGUP__"):
-        sip_client: SIPClient = app_state["sip_client"]
-        blacklist_store: BlacklistStore = app_state.get("blacklist_store")
-        caller_id = agent_manager._current_caller
-
-        logger.warning(f"Anruf wird beendet (Security Gate): {caller_id}")
-
-        # AI stumm schalten (Anruf wird eh beendet)
-        voice_client.muted = True
-        voice_client._unmute_after_response = True
-        _cancel_security_timeout()
-
-        # Fehlgeschlagenen Anruf aufzeichnen und Auto-Blacklist pruefen
-        if blacklist_store and caller_id:
-            await blacklist_store.record_failed_call(caller_id)
-            blacklisted = await blacklist_store.check_and_auto_blacklist(caller_id)
-            if blacklisted:
-                await ws_manager.broadcast({
-                    "type": "blacklist_updated",
-                })
-
-        # Auflegen
-        if sip_client and sip_client.is_in_call:
-            await sip_client.hangup()
-
-        result = "Anruf wird beendet - zu viele fehlgeschlagene Versuche."
-
-        await ws_manager.broadcast({
-            "type": "function_result",
-            "name": name,
-            "result": result,
-        })
-        return result
+    _broadcast_function_result(name, "Falscher Code (Beep)")
 
-    # Pruefen ob der Benutzer auflegen moechte (normales Auflegen, kein Security-Hangup)
-    if result and result == "__HANGUP_USER__":
-        sip_client: SIPClient = app_state["sip_client"]
+    # __BEEP_QUIET__: Result senden aber KEINE neue Response triggern
+    # AI wartet passiv auf naechsten Audio-Input vom Anrufer
+    return "__BEEP_QUIET__:Warte auf Code."
 
-        logger.info("Anruf wird beendet (Benutzer hat aufgelegt)")
 
-        _cancel_security_timeout()
+async def _handle_hangup(name: str, arg: str) -> str:
+    """__HANGUP__: Security Gate, zu viele Fehlversuche."""
+    sip_client: SIPClient = app_state.sip_client
+    voice_client: VoiceClient = app_state.voice_client
+    agent_manager: AgentManager = app_state.agent_manager
+    caller_id = agent_manager._current_caller
 
-        # Auflegen
-        if sip_client and sip_client.is_in_call:
-            await sip_client.hangup()
+    logger.warning("Anruf wird beendet (Security Gate): %s", caller_id)
 
-        result = "Anruf wird beendet."
+    # AI stumm schalten (Anruf wird eh beendet)
+    voice_client.muted = True
+    voice_client._unmute_after_response = True
+    _cancel_security_timeout()
 
-        await ws_manager.broadcast({
-            "type": "function_result",
-            "name": name,
-            "result": result,
-        })
+    # Fehlgeschlagenen Anruf im Hintergrund speichern, Auflegen wartet nicht auf die DB
+    _schedule_failed_call(caller_id)
+
+    # Auflegen
+    if sip_client and sip_client.is_in_call:
+        await sip_client.hangup()
+
+    result = "Anruf wird beendet - zu viele fehlgeschlagene Versuche."
+    _broadcast_function_result(name, result)
+    return result
+
+
+async def _handle_hangup_user(name: str, arg: str) -> str:
+    """__HANGUP_USER__: Benutzer moechte auflegen (kein Security-Hangup)."""
+    sip_client: SIPClient = app_state.sip_client
+
+    logger.info("Anruf wird beendet (Benutzer hat aufgelegt)")
+
+    _cancel_security_timeout()
+
+    # Auflegen
+    if sip_client and sip_client.is_in_call:
+        await sip_client.hangup()
+
+    result = "Anruf wird beendet."
+    _broadcast_function_result(name, result)
+    return result
+
+
+async def _handle_model_switch(name: str, model_key: str) -> str:
+    """__MODEL_SWITCH__:<key>: Modell wechseln ("mini" oder "premium")."""
+    voice_client: VoiceClient = app_state.voice_client
+    agent_manager: AgentManager = app_state.agent_manager
+    model_id = MODEL_MAP.get(model_key)
+
+    if not (model_id and voice_client and voice_client.is_connected):
+        result = f"Modell-Wechsel zu '{model_key}' nicht moeglich."
+        _broadcast_function_result(name, result)
         return result
 
-    # Pruefen ob das Ergebnis ein Model-Switch-Signal ist
-    if result and result.startswith("__MODEL_SWITCH__:"):
-        model_key = result.split(":", 1)[1]  # "mini" oder "premium"
-        model_id = MODEL_MAP.get(model_key)
+    _set_model_state(app_state.call_state, model_key, user_chosen=True)
 
-        if model_id and voice_client and voice_client.is_connected:
-            # Globals muessen in on_function_call scope erreichbar sein
-            _set_model_state(model_key, user_chosen=True)
+    # Tools/Instructions VOR Reconnect konfigurieren
+    is_sec = agent_manager.active_agent_name == "security_agent"
+    voice_client.configure_for_agent(
+        agent_manager.get_tools(),
+        agent_manager.get_instructions(),
+        text_only=is_sec
+    )
+    success = await voice_client.switch_model_live(model_id)
 
-            # Tools/Instructions VOR Reconnect konfigurieren
+    label = "Mini" if model_key == "mini" else "Premium"
+    if success:
+        logger.info("Model-Switch via Tool: -> %s", model_key)
+    else:
+        label = f"{model_key} (fehlgeschlagen)"
+
+    _broadcast_function_result(name, f"Modell: {label}")
+    return "__MODEL_SWITCHED__"
+
+
+async def _handle_agent_switch(name: str, target_agent: str) -> str:
+    """__SWITCH__:<agent>: Agent wechseln (ggf. mit Modell-Wechsel)."""
+    voice_client: VoiceClient = app_state.voice_client
+    agent_manager: AgentManager = app_state.agent_manager
+    success = await agent_manager.switch_agent(target_agent)
+    if success:
+        # Security Gate: Wenn von security_agent weggewechselt wird, Anruf freischalten
+        if agent_manager.active_agent_name != "security_agent":
+            agent_manager.set_call_unlocked(True)
+            _cancel_security_timeout()
+
+        # Pruefen ob der neue Agent ein anderes Modell erzwingt
+        new_tools = agent_manager.get_tools()
+        new_instructions = agent_manager.get_instructions()
+        preferred = agent_manager.active_agent.preferred_model if agent_manager.active_agent else None
+        target_key = preferred if preferred else app_state.call_state.user_chosen_model
+        target_model = MODEL_MAP.get(target_key)
+        needs_model_switch = target_model and target_model != voice_client.model
+
+        if needs_model_switch and voice_client and voice_client.is_connected:
+            # Model-Switch: configure_for_agent VOR Reconnect damit neue Tools geladen werden
+            _set_model_state(app_state.call_state, target_key)
             is_sec = agent_manager.active_agent_name == "security_agent"
-            voice_client.configure_for_agent(
-                agent_manager.get_tools(),
-                agent_manager.get_instructions(),
+            voice_client.configure_for_agent(new_tools, new_instructions, text_only=is_sec)
+            await voice_client.switch_model_live(target_model)
+            logger.info("Agent-Switch + Model-Switch: -> %s (%s)", target_agent, target_key)
+
+            _broadcast_function_result(name, f"Agent: {target_agent}, Modell: {target_key}")
+            return "__MODEL_SWITCHED__"
+
+        # Kein Model-Switch: Session normal aktualisieren
+        if voice_client and voice_client.is_connected:
+            is_sec = agent_manager.active_agent_name == "security_agent"
+            await voice_client.update_session(
+                tools=new_tools,
+                instructions=new_instructions,
                 text_only=is_sec
             )
-            success = await voice_client.switch_model_live(model_id)
-
-            label = "Mini" if model_key == "mini" else "Premium"
-            if success:
-                logger.info(f"Model-Switch via Tool: -> {model_key}")
-            else:
-                label = f"{model_key} (fehlgeschlagen)"
-
-            await ws_manager.broadcast({
-                "type": "function_result",
-                "name": name,
-                "result": f"Modell: {label}",
-            })
-            return "__MODEL_SWITCHED__"
-        else:
-            result = f"Modell-Wechsel zu '{model_key}' nicht moeglich."
 
-        await ws_manager.broadcast({
-            "type": "function_result",
-            "name": name,
-            "result": result,
-        })
-        return result
+        display = agent_manager.active_agent.display_name if agent_manager.active_agent else target_agent
+        result = f"Du bist jetzt verbunden mit: {display}"
+        logger.info("Agent-Switch via Tool: -> %s", target_agent)
+    else:
+        result = f"Agent-Wechsel zu '{target_agent}' fehlgeschlagen."
 
-    # Pruefen ob das Ergebnis ein Agent-Switch-Signal ist
-    if result and result.startswith("__SWITCH__:"):
-        target_agent = result.split(":", 1)[1]
-        success = await agent_manager.switch_agent(target_agent)
-        if success:
-            # Security Gate: Wenn von security_agent weggewechselt wird, Anruf freischalten
-            if agent_manager.active_agent_name != "security_agent":
-                agent_manager.set_call_unlocked(True)
-                _cancel_security_timeout()
-
-            # Pruefen ob der neue Agent ein anderes Modell erzwingt
-            new_tools = agent_manager.get_tools()
-            new_instructions = agent_manager.get_instructions()
-            preferred = agent_manager.active_agent.preferred_model if agent_manager.active_agent else None
-            target_key = preferred if preferred else _user_chosen_model
-            target_model = MODEL_MAP.get(target_key)
-            needs_model_switch = target_model and target_model != voice_client.model
-
-            if needs_model_switch and voice_client and voice_client.is_connected:
-                # Model-Switch: configure_for_agent VOR Reconnect damit neue Tools geladen werden
-                _set_model_state(target_key)
-                is_sec = agent_manager.active_agent_name == "security_agent"
-                voice_client.configure_for_agent(new_tools, new_instructions, text_only=is_sec)
-                await voice_client.switch_model_live(target_model)
-                logger.info(f"Agent-Switch + Model-Switch: -> {target_agent} ({target_key})")
-
-                await ws_manager.broadcast({
-                    "type": "function_result",
-                    "name": name,
-                    "result": f"Agent: {target_agent}, Modell: {target_key}",
-                })
-                return "__MODEL_SWITCHED__"
-            else:
-                # Kein Model-Switch: Session normal aktualisieren
-                if voice_client and voice_client.is_connected:
-                    is_sec = agent_manager.active_agent_name == "security_agent"
-                    await voice_client.update_session(
-                        tools=new_tools,
-                        instructions=new_instructions,
-                        text_only=is_sec
-                    )
-
-            display = agent_manager.active_agent.display_name if agent_manager.active_agent else target_agent
-            result = f"Du bist jetzt verbunden mit: {display}"
-            logger.info(f"Agent-Switch via Tool: -> {target_agent}")
-        else:
-            result = f"Agent-Wechsel zu '{target_agent}' fehlgeschlagen."
+    _broadcast_function_result(name, result[:200])
+    return result
 
-    # Ergebnis an GUI
-    await ws_manager.broadcast({
-        "type": "function_result",
+
+# Exakte Signale: ein Dict-Lookup; Praefix-Signale (mit Argument nach ":") der Reihe nach
+_EXACT_RESULT_HANDLERS = {
+    "__BEEP__": _handle_beep,
+    "__HANGUP_USER__": _handle_hangup_user,
+}
+_PREFIX_RESULT_HANDLERS = (
+    ("__HANGUP__", _handle_hangup),
+    ("__MODEL_SWITCH__:", _handle_model_switch),
+    ("__SWITCH__:", _handle_agent_switch),
+)
+
+
+async def on_function_call(call_id: str, name: str, arguments: dict) -> str:
+    """Function Call von AI -> Agent-Manager fuehrt Tool aus."""
+    agent_manager: AgentManager = app_state.agent_manager
+    ws_manager: ConnectionManager = app_state.ws_manager
+
+    # An GUI senden
+    ws_manager.broadcast_nowait({
+        "type": "function_call",
         "name": name,
-        "result": result[:200] if result else "",
+        "arguments": arguments,
     })
 
+    # Agent fuehrt Tool aus
+    result = await agent_manager.execute_tool(name, arguments)
+
+    # Sentinel-Signale (Beep, Hangup, Model-/Agent-Switch) an ihren Handler geben
+    if result and result.startswith("__"):
+        handler = _EXACT_RESULT_HANDLERS.get(result)
+        if handler is not None:
+            return await handler(name, "")
+        for prefix, prefix_handler in _PREFIX_RESULT_HANDLERS:
+            # removeprefix: Praefix-Test und Argument in einem Schritt
+            arg = result.removeprefix(prefix)
+            if arg != result:
+                return await prefix_handler(name, arg)
+
+    # Ergebnis an GUI
+    _broadcast_function_result(name, result[:200] if result else "")
     return result
 
 
 async def on_interruption():
     """User hat die AI unterbrochen (Barge-In)."""
-    sip_client: SIPClient = app_state["sip_client"]
+    sip_client: SIPClient = app_state.sip_client
 
     if sip_client:
         cleared = sip_client.clear_audio_queue()
@@ -623,30 +750,34 @@ async def on_interruption():
 
 async def on_call_ended(reason: str):
     """Anruf beendet."""
-    voice_client: VoiceClient = app_state["voice_client"]
-    agent_manager: AgentManager = app_state["agent_manager"]
-    ws_manager: ConnectionManager = app_state["ws_manager"]
+    voice_client: VoiceClient = app_state.voice_client
+    agent_manager: AgentManager = app_state.agent_manager
+    ws_manager: ConnectionManager = app_state.ws_manager
 
     logger.info(f"Anruf beendet: {reason}")
 
+    _cancel_greeting()
     _cancel_security_timeout()
 
     # Per-Call Log Capture beenden
-    global _call_log_handler
+    state = app_state.call_state
     call_logs = ''
-    if _call_log_handler:
-        call_logs = _call_log_handler.get_logs()
-        logging.getLogger().removeHandler(_call_log_handler)
-        _call_log_handler = None
+    if state.log_handler:
+        call_logs = state.log_handler.get_logs()
+        logging.getLogger().removeHandler(state.log_handler)
+        state.log_handler = None
+
+    # Gedrosseltes Usage-Update noch verrechnen, bevor die Kosten gespeichert werden
+    await voice_client.flush_usage()
 
     # Anruf-Ende in DB aufzeichnen
-    db = app_state.get("db")
-    call_id = app_state.pop("_current_call_id", None)
+    db = app_state.db
+    call_id, app_state.current_call_id = app_state.current_call_id, None
     if db and call_id:
         now = datetime.utcnow()
-        duration = int((now - _call_started_at).total_seconds()) if _call_started_at else 0
-        cost_cents = round(_call_cost_usd * 100, 2)
-        transcript_json = json.dumps(_call_transcript, ensure_ascii=False)
+        duration = int((now - state.started_at).total_seconds()) if state.started_at else 0
+        cost_cents = round(state.cost_usd * 100, 2)
+        transcript_json = json_dumps(state.transcript)
         await db.execute(
             """UPDATE calls SET ended_at = ?, duration_seconds = ?,
                cost_cents = ?, transcript = ?, logs = ? WHERE id = ?""",
@@ -655,8 +786,10 @@ async def on_call_ended(reason: str):
 
     await agent_manager.end_call()
     await voice_client.disconnect()
+    # Resampler-Streams neu anlegen: Filterzustand nicht in den naechsten Anruf tragen
+    reset_resamplers()
 
-    await ws_manager.broadcast({
+    ws_manager.broadcast_nowait({
         "type": "call_ended",
         "reason": reason,
     })
@@ -664,8 +797,8 @@ async def on_call_ended(reason: str):
 
 async def on_model_changed(model_key: str):
     """AI-Modell wurde gewechselt."""
-    ws_manager: ConnectionManager = app_state["ws_manager"]
-    await ws_manager.broadcast({
+    ws_manager: ConnectionManager = app_state.ws_manager
+    ws_manager.broadcast_nowait({
         "type": "model_changed",
         "model": model_key,
     })
@@ -673,31 +806,34 @@ async def on_model_changed(model_key: str):
 
 async def on_ai_state_changed(state: str):
     """AI-Status hat sich geaendert (idle/listening/user_speaking/thinking/speaking)."""
-    ws_manager: ConnectionManager = app_state["ws_manager"]
-    await ws_manager.broadcast({
+    ws_manager: ConnectionManager = app_state.ws_manager
+    ws_manager.broadcast_nowait({
         "type": "ai_state",
         "state": state,
     })
 
 
-async def on_usage_update(usage: dict):
+async def on_usage_update(usage: Usage):
     """Token-Usage Update von OpenAI - Delta-Kosten berechnen und broadcasten."""
-    ws_manager: ConnectionManager = app_state["ws_manager"]
-    cost = _calculate_delta_cost(usage)
-    await ws_manager.broadcast({
+    ws_manager: ConnectionManager = app_state.ws_manager
+    state = app_state.call_state
+    cost, delta = _calculate_delta_cost(state, usage)
+    if delta == 0.0:
+        return  # Keine neuen Tokens: Dashboard hat den Stand schon
+    ws_manager.broadcast_nowait({
         "type": "call_cost",
         "cost_usd": round(cost, 6),
         "cost_cents": round(cost * 100, 2),
-        "usage": usage,
-        "model": _current_model_key,
+        "usage": asdict(usage),
+        "model": state.current_model_key,
     })
 
 
 async def on_agent_changed(old_agent: str, new_agent: str):
     """Agent wurde gewechselt."""
-    ws_manager: ConnectionManager = app_state["ws_manager"]
+    ws_manager: ConnectionManager = app_state.ws_manager
 
-    await ws_manager.broadcast({
+    ws_manager.broadcast_nowait({
         "type": "agent_changed",
         "old_agent": old_agent,
         "new_agent": new_agent,
@@ -706,14 +842,26 @@ async def on_agent_changed(old_agent: str, new_agent: str):
 
 # ============== Lifespan ==============
 
+def _wire_agent(agent, registry: AgentRegistry, ws_manager: ConnectionManager):
+    """Registry-Hook: Abhaengigkeiten in einen frisch geladenen Agenten injizieren."""
+    # MainAgent: Registry (fuer dynamische Agent-Liste)
+    if hasattr(agent, "set_registry"):
+        agent.set_registry(registry)
+        logger.info(f"AgentRegistry in {agent.name} injiziert")
+    # Code-/Ideas-Agent: WebSocket-Manager (Coding-Progress, Ideen-Updates)
+    if hasattr(agent, "set_ws_manager"):
+        agent.set_ws_manager(ws_manager)
+        logger.info(f"WebSocket-Manager in {agent.name} injiziert")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifecycle management."""
     logger.info("=== VoiceAgent Platform startet ===")
 
     # Database initialisieren
+    # get_database() initialisiert die Instanz bereits (WAL, PRAGMAs, Schema, Reader-Pool)
     db = await get_database()
-    await db.initialize()
 
     # Task-System
     task_store = TaskStore(db)
@@ -721,10 +869,25 @@ async def lifespan(app: FastAPI):
 
     # Blacklist-System
     blacklist_store = BlacklistStore(db)
+    await blacklist_store.load()
+
+    # Ideen/Projekte (fuer die REST-API, einmal pro Prozess)
+    idea_store = IdeaStore(db)
+    project_planner = ProjectPlanner(db)
+
+    # WebSocket Manager
+    ws_manager = ConnectionManager()
 
     # Agent-System
     agent_registry = AgentRegistry()
-    agent_registry.discover_agents(settings.AGENTS_DIR)
+    # Abhaengigkeiten erst beim Laden eines Agenten injizieren (auch bei spaeterem Lazy-Import)
+    agent_registry.on_agent_loaded = partial(
+        _wire_agent, registry=agent_registry, ws_manager=ws_manager
+    )
+    # Nur Security- und Main-Agent sofort importieren, die uebrigen beim ersten Zugriff
+    agent_registry.discover_agents(
+        settings.AGENTS_DIR, preload=("security_agent", "main_agent")
+    )
     logger.info(f"Agenten entdeckt: {agent_registry.count}")
 
     agent_manager = AgentManager(agent_registry, default_agent="security_agent")
@@ -738,45 +901,26 @@ async def lifespan(app: FastAPI):
     # AI Voice Client
     voice_client = VoiceClient()
 
-    # WebSocket Manager
-    ws_manager = ConnectionManager()
-
     # App State zusammenbauen
-    app_state.update({
-        "db": db,
-        "task_store": task_store,
-        "task_executor": task_executor,
-        "blacklist_store": blacklist_store,
-        "agent_registry": agent_registry,
-        "agent_manager": agent_manager,
-        "agent_router": agent_router,
-        "sip_client": sip_client,
-        "voice_client": voice_client,
-        "ws_manager": ws_manager,
-    })
-
-    # MainAgent: Registry injizieren (fuer dynamische Agent-Liste)
-    main_agent = agent_registry.get_agent("main_agent")
-    if main_agent and hasattr(main_agent, "set_registry"):
-        main_agent.set_registry(agent_registry)
-        logger.info("AgentRegistry in Main-Agent injiziert")
-
-    # WebSocket-Manager in Code-Agent injizieren (fuer Coding-Progress)
-    code_agent = agent_registry.get_agent("code_agent")
-    if code_agent and hasattr(code_agent, "set_ws_manager"):
-        code_agent.set_ws_manager(ws_manager)
-        logger.info("WebSocket-Manager in Code-Agent injiziert")
-
-    # WebSocket-Manager in Ideas-Agent injizieren (fuer Ideen-Updates)
-    ideas_agent = agent_registry.get_agent("ideas_agent")
-    if ideas_agent and hasattr(ideas_agent, "set_ws_manager"):
-        ideas_agent.set_ws_manager(ws_manager)
-        logger.info("WebSocket-Manager in Ideas-Agent injiziert")
+    app_state.db = db
+    app_state.task_store = task_store
+    app_state.task_executor = task_executor
+    app_state.blacklist_store = blacklist_store
+    app_state.idea_store = idea_store
+    app_state.project_planner = project_planner
+    app_state.agent_registry = agent_registry
+    app_state.agent_manager = agent_manager
+    app_state.agent_router = agent_router
+    app_state.sip_client = sip_client
+    app_state.voice_client = voice_client
+    app_state.ws_manager = ws_manager
 
     # Event Handler verbinden
     sip_client.on_incoming_call = on_incoming_call
     sip_client.on_audio_received = on_audio_from_caller
     sip_client.on_call_ended = on_call_ended
+    sip_client.on_call_rejected = on_call_rejected
+    sip_client.call_filter = is_ip_allowed
 
     voice_client.on_audio_response = on_audio_from_ai
     voice_client.on_transcript = on_transcript
@@ -801,6 +945,7 @@ async def lifespan(app: FastAPI):
     logger.info("Server wird heruntergefahren...")
     await sip_client.stop()
     await voice_client.disconnect()
+    await ws_manager.stop()
     await db.close()
 
 
@@ -810,9 +955,15 @@ app = FastAPI(
     title="VoiceAgent Platform API",
     description="Modulare Voice-Agent Plattform mit SIP und OpenAI Realtime API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
+# API-Key (optional): nur aktiv wenn API_KEY gesetzt.
+# Vor CORS registriert, damit CORS aussen liegt und Preflights selbst beantwortet.
+if settings.API_KEY:
+    app.add_middleware(APIKeyMiddleware, api_key=settings.API_KEY)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
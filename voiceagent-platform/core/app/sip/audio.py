@@ -10,7 +10,7 @@ Konvertiert Audio zwischen verschiedenen Sample-Rates:
 import logging
 
 import numpy as np
-from scipy import signal as scipy_signal
+import soxr
 
 from core.app.config import settings
 
@@ -32,17 +32,41 @@ def resample_audio(audio_data: bytes, from_rate: int, to_rate: int) -> bytes:
     if from_rate == to_rate:
         return audio_data
 
-    # Bytes zu numpy array (16-bit signed)
-    samples = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32)
+    # Polyphase-Resampler (soxr) arbeitet direkt auf int16:
+    # kein float32-Cast, kein Clip, keine FFT pro Frame
+    samples = np.frombuffer(audio_data, dtype=np.int16)
+    resampled = soxr.resample(samples, from_rate, to_rate, quality="QQ")
 
-    # Resampling
-    num_samples = int(len(samples) * to_rate / from_rate)
-    resampled = scipy_signal.resample(samples, num_samples)
+    return resampled.tobytes()
 
-    # Zurueck zu 16-bit signed
-    resampled = np.clip(resampled, -32768, 32767).astype(np.int16)
 
-    return resampled.tobytes()
+class StreamResampler:
+    """
+    Persistente soxr-Streams fuer beide Richtungen eines Anrufs.
+
+    Die Filter-Kernel werden einmal aufgebaut und ueber Frame-Grenzen
+    weitergefuehrt (kein Neuaufbau pro Frame, keine Artefakte an den Raendern).
+    """
+
+    def __init__(self):
+        self.reset()
+
+    @staticmethod
+    def _stream(from_rate: int, to_rate: int) -> soxr.ResampleStream:
+        return soxr.ResampleStream(from_rate, to_rate, 1, dtype="int16", quality="QQ")
+
+    def reset(self):
+        """Streams neu anlegen (nach Anrufende: Filter-Verzoegerung des alten Anrufs verwerfen)."""
+        self.down = self._stream(settings.SAMPLE_RATE_SIP, settings.SAMPLE_RATE_AI_INPUT)
+        self.up = self._stream(settings.SAMPLE_RATE_AI_OUTPUT, settings.SAMPLE_RATE_SIP)
+
+
+_resampler = StreamResampler()
+
+
+def reset_resamplers():
+    """Setzt die Resampler-Streams zurueck (bei Anrufende aufrufen)."""
+    _resampler.reset()
 
 
 def sip_to_ai_input(audio_data: bytes) -> bytes:
@@ -55,11 +79,8 @@ def sip_to_ai_input(audio_data: bytes) -> bytes:
     Returns:
         PCM16 @ 16kHz
     """
-    return resample_audio(
-        audio_data,
-        settings.SAMPLE_RATE_SIP,
-        settings.SAMPLE_RATE_AI_INPUT
-    )
+    samples = np.frombuffer(audio_data, dtype=np.int16)
+    return _resampler.down.resample_chunk(samples).tobytes()
 
 
 def ai_output_to_sip(audio_data: bytes) -> bytes:
@@ -72,8 +93,5 @@ def ai_output_to_sip(audio_data: bytes) -> bytes:
     Returns:
         PCM16 @ 48kHz
     """
-    return resample_audio(
-        audio_data,
-        settings.SAMPLE_RATE_AI_OUTPUT,
-        settings.SAMPLE_RATE_SIP
-    )
+    samples = np.frombuffer(audio_data, dtype=np.int16)
+    return _resampler.up.resample_chunk(samples).tobytes()
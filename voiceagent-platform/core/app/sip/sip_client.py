@@ -9,7 +9,7 @@ import asyncio
 import logging
 import queue
 import threading
-from typing import Callable, Optional
+from typing import Callable, Iterable, Optional
 from collections import deque
 
 from core.app.config import settings
@@ -167,6 +167,10 @@ class AudioMediaPort(pj.AudioMediaPort if PJSUA2_AVAILABLE else object):
         if queue_len == 500:
             logger.warning(f"[TX] Audio Queue halb voll: {queue_len}/1000 Frames")
 
+    def queue_frames(self, frames: Iterable[bytes]):
+        """Fertige 20ms-Frames direkt einreihen (ohne Umweg ueber den Frame-Splitting-Buffer)."""
+        self._outgoing_queue.extend(frames)
+
     def set_incoming_callback(self, callback: Callable):
         """Callback fuer eingehendes Audio (vom Anrufer) setzen."""
         self._incoming_callback = callback
@@ -303,6 +307,11 @@ class SIPClient:
         self.on_incoming_call: Optional[Callable] = None
         self.on_audio_received: Optional[Callable] = None
         self.on_call_ended: Optional[Callable] = None
+        self.on_call_rejected: Optional[Callable] = None
+
+        # Firewall-Filter (remote_ip, caller_uri) -> bool, laeuft synchron im PJSIP Thread:
+        # abgelehnte Anrufe werden verworfen bevor Media-Port und asyncio-Event entstehen
+        self.call_filter: Optional[Callable[[Optional[str], str], bool]] = None
 
     @property
     def is_registered(self) -> bool:
@@ -473,6 +482,16 @@ class SIPClient:
 
     def _on_incoming_call(self, caller_uri: str, call: CallCallback, remote_ip: str = None):
         """Incoming Call Callback (im PJSIP Thread)."""
+        if self.call_filter and not self.call_filter(remote_ip, caller_uri):
+            logger.warning(f"ABGELEHNT: Anruf von nicht autorisierter IP {remote_ip}")
+            self._do_reject_call(403)
+            self._emit_event("call_rejected", {
+                "caller_id": caller_uri,
+                "remote_ip": remote_ip,
+                "reason": "IP nicht auf Whitelist",
+            })
+            return
+
         self._current_caller = caller_uri
         self._current_remote_ip = remote_ip
         call.on_state_changed = self._on_call_state
@@ -536,6 +555,11 @@ class SIPClient:
                         await self.on_incoming_call(
                             event.get("caller_id"), event.get("remote_ip")
                         )
+                elif event_type == "call_rejected":
+                    if self.on_call_rejected:
+                        await self.on_call_rejected(
+                            event.get("caller_id"), event.get("remote_ip"), event.get("reason")
+                        )
                 elif event_type == "call_ended":
                     if self.on_call_ended:
                         await self.on_call_ended(event.get("reason"))
@@ -606,6 +630,11 @@ class SIPClient:
         if self._audio_port and self._in_call:
             self._audio_port.queue_audio(audio_data)
 
+    async def send_audio_frames(self, frames: Iterable[bytes]):
+        """Vorab in 20ms zerlegtes Audio an Anrufer senden (z.B. Beep)."""
+        if self._audio_port and self._in_call:
+            self._audio_port.queue_frames(frames)
+
     def clear_audio_queue(self) -> int:
         """Leert die Audio-Queue (fuer Barge-In/Interruption)."""
         if self._audio_port:
@@ -2,11 +2,11 @@
 Task-Persistierung mit SQLite.
 """
 
-import json
 import logging
 from datetime import datetime
 from typing import Optional
 
+from core.app.db.database import json_dumps, json_loads
 from core.app.tasks.models import Task, TaskStatus
 
 logger = logging.getLogger(__name__)
@@ -26,7 +26,7 @@ class TaskStore:
                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
             (task.id, task.agent_name, task.description, task.status.value,
              task.result, task.error, task.progress, task.caller_id,
-             json.dumps(task.metadata), task.created_at.isoformat(),
+             json_dumps(task.metadata), task.created_at.isoformat(),
              task.updated_at.isoformat())
         )
         logger.info(f"Task erstellt: {task.id} ({task.description[:50]})")
@@ -48,7 +48,7 @@ class TaskStore:
             """UPDATE tasks SET status=?, result=?, error=?, progress=?,
                metadata=?, updated_at=? WHERE id=?""",
             (task.status.value, task.result, task.error, task.progress,
-             json.dumps(task.metadata), task.updated_at.isoformat(), task.id)
+             json_dumps(task.metadata), task.updated_at.isoformat(), task.id)
         )
         return task
 
@@ -91,7 +91,7 @@ class TaskStore:
         """DB-Zeile zu Task konvertieren."""
         metadata = row.get("metadata", "{}")
         if isinstance(metadata, str):
-            metadata = json.loads(metadata)
+            metadata = json_loads(metadata)
         return Task(
             id=row["id"],
             agent_name=row["agent_name"],
@@ -2,9 +2,11 @@
 WebSocket Connection Manager fuer GUI/Dashboard Clients.
 """
 
+import asyncio
 import logging
 from typing import List
 
+import orjson
 from fastapi import WebSocket
 
 logger = logging.getLogger(__name__)
@@ -13,12 +15,46 @@ logger = logging.getLogger(__name__)
 class ConnectionManager:
     """Verwaltet WebSocket-Verbindungen zu GUI/Dashboard Clients."""
 
+    # Max. ausstehende Nachrichten pro Client, danach wird der Client getrennt
+    SEND_QUEUE_SIZE = 256
+
     def __init__(self):
         self.active_connections: List[WebSocket] = []
+        # Pro Client eine begrenzte Sende-Queue und ein Writer-Task, der sie abarbeitet:
+        # ein langsamer Client staut nur seine eigene Queue, nie den Aufrufer
+        self._queues: dict[WebSocket, asyncio.Queue[str]] = {}
+        self._writers: dict[WebSocket, asyncio.Task] = {}
+        self._closing: set[asyncio.Task] = set()
+
+    async def stop(self):
+        """Stoppt alle Writer-Tasks; noch eingereihte Nachrichten werden verworfen."""
+        writers = list(self._writers.values())
+        for websocket in list(self.active_connections):
+            self.disconnect(websocket)
+        for task in writers:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _writer(self, websocket: WebSocket, queue: asyncio.Queue[str]):
+        """Sendet die Nachrichten eines Clients in Reihenfolge."""
+        try:
+            while True:
+                text = await queue.get()
+                await websocket.send_text(text)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"Send Fehler: {e}")
+            self.disconnect(websocket)
 
     async def connect(self, websocket: WebSocket):
         """Neue Verbindung akzeptieren."""
         await websocket.accept()
+        queue: asyncio.Queue[str] = asyncio.Queue(maxsize=self.SEND_QUEUE_SIZE)
+        self._queues[websocket] = queue
+        self._writers[websocket] = asyncio.create_task(self._writer(websocket, queue))
         self.active_connections.append(websocket)
         logger.info(
             f"Client verbunden. Aktive Verbindungen: {len(self.active_connections)}"
@@ -28,31 +64,65 @@ class ConnectionManager:
         """Verbindung entfernen."""
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+        self._queues.pop(websocket, None)
+        writer = self._writers.pop(websocket, None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
         logger.info(
             f"Client getrennt. Aktive Verbindungen: {len(self.active_connections)}"
         )
 
-    async def broadcast(self, message: dict):
-        """Nachricht an alle verbundenen Clients senden."""
-        disconnected = []
+    def _enqueue(self, websocket: WebSocket, text: str):
+        """Nachricht in die Queue eines Clients legen; bei voller Queue den Client trennen."""
+        queue = self._queues.get(websocket)
+        if queue is None:
+            return
+        try:
+            queue.put_nowait(text)
+        except asyncio.QueueFull:
+            logger.warning("WebSocket-Client zu langsam (Sende-Queue voll), Verbindung wird getrennt")
+            self.disconnect(websocket)
+            task = asyncio.create_task(self._close(websocket))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
 
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.debug(f"Broadcast Fehler: {e}")
-                disconnected.append(connection)
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        """Verbindung eines getrennten Clients schliessen (Fehler ignorieren)."""
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+    def broadcast_nowait(self, message: dict):
+        """
+        Nachricht an alle verbundenen Clients senden, ohne auf den Versand zu warten.
 
-        for conn in disconnected:
-            self.disconnect(conn)
+        Die Nachricht wird sofort einmal serialisiert (spaetere Aenderungen am dict
+        wirken nicht mehr) und in die Sende-Queue jedes Clients gelegt
+        (Text-Frame, das Dashboard parst per JSON.parse).
+        """
+        if not self.active_connections:
+            return
+        self.broadcast_raw(orjson.dumps(message).decode())
+
+    def broadcast_raw(self, text: str):
+        """
+        Bereits serialisierte JSON-Nachricht an alle Clients senden.
+
+        Derselbe String landet in jeder Sende-Queue; fuer Aufrufer, die den
+        Payload ohnehin schon als JSON haben (kein erneutes Serialisieren).
+        """
+        for connection in list(self.active_connections):
+            self._enqueue(connection, text)
+
+    async def broadcast(self, message: dict):
+        """Wie broadcast_nowait (gleiche Queues, damit die Reihenfolge erhalten bleibt)."""
+        self.broadcast_nowait(message)
 
     async def send_to(self, websocket: WebSocket, message: dict):
-        """Nachricht an spezifischen Client senden."""
-        try:
-            await websocket.send_json(message)
-        except Exception as e:
-            logger.debug(f"Send Fehler: {e}")
-            self.disconnect(websocket)
+        """Nachricht an spezifischen Client senden (ueber dessen Sende-Queue)."""
+        self._enqueue(websocket, orjson.dumps(message).decode())
 
     @property
     def connection_count(self) -> int:
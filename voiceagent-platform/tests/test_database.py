@@ -0,0 +1,101 @@
+"""Tests fuer core.app.db.database (Transaktionen auf der gemeinsamen Schreib-Verbindung)."""
+
+import asyncio
+
+import pytest
+
+from core.app.db.database import Database
+
+
+def test_write_during_rolled_back_transaction_is_kept(tmp_path):
+    """Ein fremder Write waehrend einer offenen Transaktion darf nicht mit ihr zurueckgerollt werden."""
+
+    async def scenario():
+        db = Database(str(tmp_path / "test.db"), reader_pool_size=1)
+        await db.initialize()
+        try:
+            in_transaction = asyncio.Event()
+
+            async def failing_transaction():
+                with pytest.raises(RuntimeError):
+                    async with db.transaction():
+                        await db.execute(
+                            "INSERT INTO blacklist (caller_id, reason) VALUES (?, ?)",
+                            ("+491111", "tx"),
+                        )
+                        in_transaction.set()
+                        # Dem anderen Task Zeit geben, seinen Write abzusetzen
+                        await asyncio.sleep(0.05)
+                        raise RuntimeError("abbrechen")
+
+            async def concurrent_write():
+                await in_transaction.wait()
+                await db.execute(
+                    "INSERT INTO whitelist (caller_id, note) VALUES (?, ?)",
+                    ("+492222", "ausserhalb"),
+                )
+
+            await asyncio.gather(failing_transaction(), concurrent_write())
+
+            assert await db.fetch_one(
+                "SELECT 1 FROM blacklist WHERE caller_id = ?", ("+491111",)
+            ) is None
+            assert await db.fetch_one(
+                "SELECT 1 FROM whitelist WHERE caller_id = ?", ("+492222",)
+            ) is not None
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_transaction_commits_all_statements(tmp_path):
+    """Statements innerhalb von transaction() werden gemeinsam committet."""
+
+    async def scenario():
+        db = Database(str(tmp_path / "test.db"), reader_pool_size=1)
+        await db.initialize()
+        try:
+            async with db.transaction():
+                await db.execute("INSERT INTO whitelist (caller_id) VALUES (?)", ("+49a",))
+                await db.execute("INSERT INTO whitelist (caller_id) VALUES (?)", ("+49b",))
+            rows = await db.fetch_all("SELECT caller_id FROM whitelist ORDER BY caller_id")
+            assert [row["caller_id"] for row in rows] == ["+49a", "+49b"]
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_call_search_survives_vacuum(tmp_path):
+    """Der Volltext-Index haengt an calls.fts_rowid und zeigt nach VACUUM weiter auf die richtigen Anrufe."""
+
+    async def scenario():
+        db = Database(str(tmp_path / "test.db"), reader_pool_size=1)
+        await db.initialize()
+        try:
+            if not db.fts_enabled:
+                pytest.skip("SQLite ohne FTS5")
+            for call_id, word in (("call-a", "apfel"), ("call-b", "birne"), ("call-c", "kirsche")):
+                await db.execute(
+                    "INSERT INTO calls (id, caller_id, started_at) VALUES (?, ?, ?)",
+                    (call_id, "sip:test", "2026-01-01T00:00:00"),
+                )
+                await db.execute(
+                    "UPDATE calls SET transcript = ? WHERE id = ?",
+                    (f'[{{"role": "caller", "text": "{word}"}}]', call_id),
+                )
+            await db.execute("DELETE FROM calls WHERE id = ?", ("call-a",))
+            await db.execute("VACUUM")
+
+            rows = await db.fetch_all(
+                """SELECT c.id FROM calls_fts
+                   JOIN calls c ON c.fts_rowid = calls_fts.rowid
+                   WHERE calls_fts MATCH ?""",
+                ("kirsche",),
+            )
+            assert [row["id"] for row in rows] == ["call-c"]
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
@@ -931,8 +931,37 @@
     // ============================================
     // REST API
     // ============================================
+    // API-Key: nur noetig wenn der Server mit API_KEY laeuft. Wird beim ersten 401
+    // einmal abgefragt und im localStorage gemerkt (Header X-API-Key bei jedem Request).
+    var API_KEY_STORAGE = 'voiceagent_api_key';
+    var apiKeyDeclined = false;
+
+    function apiFetch(url, options) {
+        options = options || {};
+        options.headers = options.headers || {};
+        var sentKey = localStorage.getItem(API_KEY_STORAGE);
+        if (sentKey) options.headers['X-API-Key'] = sentKey;
+
+        return fetch(url, options).then(function (r) {
+            if (r.status !== 401) return r;
+            var key = localStorage.getItem(API_KEY_STORAGE);
+            // Parallel-Request hat inzwischen einen neuen Key gespeichert: nur wiederholen
+            if (!key || key === sentKey) {
+                if (apiKeyDeclined) throw new Error('API-Key erforderlich');
+                key = window.prompt('API-Key fuer das Dashboard:');
+                if (!key) {
+                    apiKeyDeclined = true;
+                    throw new Error('API-Key erforderlich');
+                }
+                localStorage.setItem(API_KEY_STORAGE, key);
+            }
+            options.headers['X-API-Key'] = key;
+            return fetch(url, options);
+        });
+    }
+
     function fetchAgentsInfo() {
-        fetch('/agents')
+        apiFetch('/agents')
             .then(function (r) { return r.json(); })
             .then(function (data) {
                 UI.updateAgentsPanel(data.agents || [], data.active);
@@ -941,7 +970,7 @@
     }
 
     function fetchTasks() {
-        fetch('/tasks')
+        apiFetch('/tasks')
             .then(function (r) { return r.json(); })
             .then(function (data) {
                 UI.updateTasks(data.tasks || []);
@@ -950,13 +979,13 @@
     }
 
     function cancelTask(taskId) {
-        fetch('/tasks/' + taskId + '/cancel', { method: 'POST' })
+        apiFetch('/tasks/' + taskId + '/cancel', { method: 'POST' })
             .then(function () { fetchTasks(); })
             .catch(function (e) { addDebug('[API] Cancel: ' + e.message); });
     }
 
     function fetchIdeas() {
-        fetch('/ideas')
+        apiFetch('/ideas')
             .then(function (r) { return r.json(); })
             .then(function (data) {
                 State.ideas = data.ideas || [];
@@ -966,7 +995,7 @@
     }
 
     function fetchProjects() {
-        fetch('/projects')
+        apiFetch('/projects')
             .then(function (r) { return r.json(); })
             .then(function (data) {
                 State.projects = data.projects || [];
@@ -976,14 +1005,14 @@
     }
 
     function archiveIdea(ideaId) {
-        fetch('/ideas/' + ideaId + '/archive', { method: 'PUT' })
+        apiFetch('/ideas/' + ideaId + '/archive', { method: 'PUT' })
             .then(function (r) { return r.json(); })
             .then(function () { fetchIdeas(); })
             .catch(function (e) { addDebug('[API] Archive: ' + e.message); });
     }
 
     function fetchBlacklist() {
-        fetch('/blacklist')
+        apiFetch('/blacklist')
             .then(function (r) { return r.json(); })
             .then(function (data) {
                 UI.updateBlacklist(data.entries || []);
@@ -992,14 +1021,14 @@
     }
 
     function removeFromBlacklist(callerId) {
-        fetch('/blacklist/' + encodeURIComponent(callerId), { method: 'DELETE' })
+        apiFetch('/blacklist/' + encodeURIComponent(callerId), { method: 'DELETE' })
             .then(function () { fetchBlacklist(); })
             .catch(function (e) { addDebug('[API] Blacklist Remove: ' + e.message); });
     }
 
     function addCurrentCallerToBlacklist() {
         if (!State.callActive || !State.callerId) return;
-        fetch('/blacklist', {
+        apiFetch('/blacklist', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ caller_id: State.callerId, reason: 'Manuell via Dashboard' }),
@@ -1009,7 +1038,7 @@
     }
 
     function fetchWhitelist() {
-        fetch('/whitelist')
+        apiFetch('/whitelist')
             .then(function (r) { return r.json(); })
             .then(function (data) {
                 UI.updateWhitelist(data.entries || []);
@@ -1019,7 +1048,7 @@
 
     function addCurrentCallerToWhitelist() {
         if (!State.callActive || !State.callerId) return;
-        fetch('/whitelist', {
+        apiFetch('/whitelist', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ caller_id: State.callerId }),
@@ -1029,13 +1058,13 @@
     }
 
     function removeFromWhitelist(callerId) {
-        fetch('/whitelist/' + encodeURIComponent(callerId), { method: 'DELETE' })
+        apiFetch('/whitelist/' + encodeURIComponent(callerId), { method: 'DELETE' })
             .then(function () { fetchWhitelist(); })
             .catch(function (e) { addDebug('[API] Whitelist Remove: ' + e.message); });
     }
 
     function fetchCallHistory() {
-        fetch('/calls/history')
+        apiFetch('/calls/history')
             .then(function (r) { return r.json(); })
             .then(function (data) {
                 UI.updateCallHistory(data.calls || [], data.month_cost_cents || 0);
@@ -1044,7 +1073,7 @@
     }
 
     function showCallTranscript(callId) {
-        fetch('/calls/' + encodeURIComponent(callId))
+        apiFetch('/calls/' + encodeURIComponent(callId))
             .then(function (r) { return r.json(); })
             .then(function (call) {
                 var transcript = [];
@@ -1133,7 +1162,7 @@
     }
 
     function addToBlacklistFromHistory(callerId) {
-        fetch('/blacklist', {
+        apiFetch('/blacklist', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ caller_id: callerId, reason: 'Manuell via Dashboard' }),
@@ -1143,7 +1172,7 @@
     }
 
     function addToWhitelistFromHistory(callerId) {
-        fetch('/whitelist', {
+        apiFetch('/whitelist', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ caller_id: callerId }),
@@ -1153,7 +1182,7 @@
     }
 
     function toggleFirewall() {
-        fetch('/firewall', {
+        apiFetch('/firewall', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ enabled: !State.firewallEnabled }),